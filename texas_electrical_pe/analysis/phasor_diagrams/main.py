@@ -1,19 +1,22 @@
 import cmath
 import math  # Import the math module
+import numpy as np
 
 def phasor(magnitude, phase_angle):
     """
     Create a phasor given magnitude and phase angle.
     
     Parameters:
-    magnitude (float): Magnitude of the phasor
-    phase_angle (float): Phase angle in degrees
+    magnitude (float or array of float): Magnitude of the phasor
+    phase_angle (float or array of float): Phase angle in degrees
     
     Returns:
-    complex: Phasor represented as a complex number
+    complex or array of complex: Phasor represented as a complex number
     """
-    phase_radians = math.radians(phase_angle)
-    return cmath.rect(magnitude, phase_radians)
+    if np.isscalar(magnitude) and np.isscalar(phase_angle):
+        phase_radians = math.radians(phase_angle)
+        return cmath.rect(magnitude, phase_radians)
+    return magnitude * np.exp(1j * np.radians(phase_angle))
 
 def impedance(resistance, reactance):
     """
@@ -33,14 +36,223 @@ def complex_to_polar(z):
     Convert a complex number to its polar form.
     
     Parameters:
-    z (complex): Complex number
+    z (complex or array of complex): Complex number
     
     Returns:
     tuple: Magnitude and phase angle in degrees
     """
-    magnitude = abs(z)
-    phase_angle = math.degrees(cmath.phase(z))
-    return magnitude, phase_angle
+    if np.isscalar(z):
+        magnitude = abs(z)
+        phase_angle = math.degrees(cmath.phase(z))
+        return magnitude, phase_angle
+    return np.abs(z), np.degrees(np.angle(z))
+
+def _read_only(values):
+    """
+    Return a read-only view of an array.
+    """
+    view = values.view()
+    view.flags.writeable = False
+    return view
+
+class PhasorArray:
+    """
+    Array of phasors stored in a contiguous complex128 buffer.
+    
+    Magnitude and angle are computed on first access and kept until the values change.
+    Arithmetic works on the whole buffer; in-place operators reuse it without allocating.
+    The buffer is owned by the array: the input is copied, indexing returns copies, and
+    the exposed values, parts, magnitudes and angles are read-only views.
+    
+    Parameters:
+    values (array of complex): Phasors in rectangular form
+    """
+    __slots__ = ('_values', '_magnitude', '_angle', '_angle_degrees')
+
+    def __init__(self, values):
+        self._values = np.atleast_1d(np.array(values, dtype=np.complex128, order='C'))
+        self._magnitude = None
+        self._angle = None
+        self._angle_degrees = None
+
+    @classmethod
+    def _wrap(cls, values):
+        """Take ownership of a freshly allocated buffer without copying it."""
+        phasors = cls.__new__(cls)
+        phasors._values = np.ascontiguousarray(values, dtype=np.complex128)
+        phasors._magnitude = None
+        phasors._angle = None
+        phasors._angle_degrees = None
+        return phasors
+
+    @classmethod
+    def from_polar(cls, magnitude, angle, degrees=True):
+        """
+        Create phasors from magnitude and angle arrays.
+        
+        Parameters:
+        magnitude (array of float): Magnitudes of the phasors
+        angle (array of float): Phase angles
+        degrees (bool): True if angles are in degrees, False if in radians
+        
+        Returns:
+        PhasorArray: Phasors
+        """
+        magnitude, angle = np.broadcast_arrays(np.asarray(magnitude, dtype=float), np.asarray(angle, dtype=float))
+        values = np.empty(magnitude.shape, dtype=np.complex128)
+        radians = np.radians(angle) if degrees else angle
+        np.cos(radians, out=values.real)
+        np.sin(radians, out=values.imag)
+        values *= magnitude
+        return cls._wrap(values)
+
+    @classmethod
+    def from_rectangular(cls, real, imag):
+        """
+        Create phasors from real and imaginary part arrays.
+        
+        Parameters:
+        real (array of float): Real parts
+        imag (array of float): Imaginary parts
+        
+        Returns:
+        PhasorArray: Phasors
+        """
+        real, imag = np.broadcast_arrays(np.asarray(real, dtype=float), np.asarray(imag, dtype=float))
+        values = np.empty(real.shape, dtype=np.complex128)
+        values.real = real
+        values.imag = imag
+        return cls._wrap(values)
+
+    @property
+    def values(self):
+        return _read_only(self._values)
+
+    @property
+    def real(self):
+        return _read_only(self._values.real)
+
+    @property
+    def imag(self):
+        return _read_only(self._values.imag)
+
+    @property
+    def magnitude(self):
+        if self._magnitude is None:
+            self._magnitude = _read_only(np.abs(self._values))
+        return self._magnitude
+
+    @property
+    def angle(self):
+        """Phase angles in degrees."""
+        if self._angle_degrees is None:
+            self._angle_degrees = _read_only(np.degrees(self.angle_radians))
+        return self._angle_degrees
+
+    @property
+    def angle_radians(self):
+        if self._angle is None:
+            self._angle = _read_only(np.angle(self._values))
+        return self._angle
+
+    def to_polar(self, degrees=True):
+        """
+        Return magnitude and angle arrays.
+        
+        Parameters:
+        degrees (bool): True for angles in degrees, False for radians
+        
+        Returns:
+        tuple: Magnitude and phase angle arrays
+        """
+        return self.magnitude, self.angle if degrees else self.angle_radians
+
+    def conjugate(self):
+        return PhasorArray._wrap(np.conjugate(self._values))
+
+    def rotate(self, angle, degrees=True):
+        """
+        Rotate every phasor by the given angle.
+        
+        Parameters:
+        angle (float or array of float): Rotation angle
+        degrees (bool): True if the angle is in degrees, False if in radians
+        
+        Returns:
+        PhasorArray: Rotated phasors
+        """
+        return self * np.exp(1j * (np.radians(angle) if degrees else angle))
+
+    def _changed(self):
+        self._magnitude = None
+        self._angle = None
+        self._angle_degrees = None
+        return self
+
+    @staticmethod
+    def _operand(other):
+        return other._values if isinstance(other, PhasorArray) else other
+
+    def __array__(self, dtype=None, copy=None):
+        dtype = np.dtype(np.complex128 if dtype is None else dtype)
+        if dtype != self._values.dtype:
+            if copy is False:
+                raise ValueError("A copy is required to convert phasors to another dtype.")
+            return self._values.astype(dtype, casting='same_kind')
+        return self._values.copy() if copy else _read_only(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        item = self._values[index]
+        return PhasorArray(item) if isinstance(item, np.ndarray) else complex(item)
+
+    def __repr__(self):
+        return f"PhasorArray({self._values!r})"
+
+    def __neg__(self):
+        return PhasorArray._wrap(-self._values)
+
+    def __add__(self, other):
+        return PhasorArray._wrap(self._values + self._operand(other))
+
+    def __sub__(self, other):
+        return PhasorArray._wrap(self._values - self._operand(other))
+
+    def __mul__(self, other):
+        return PhasorArray._wrap(self._values * self._operand(other))
+
+    def __truediv__(self, other):
+        return PhasorArray._wrap(self._values / self._operand(other))
+
+    def __radd__(self, other):
+        return PhasorArray._wrap(self._operand(other) + self._values)
+
+    def __rsub__(self, other):
+        return PhasorArray._wrap(self._operand(other) - self._values)
+
+    def __rmul__(self, other):
+        return PhasorArray._wrap(self._operand(other) * self._values)
+
+    def __rtruediv__(self, other):
+        return PhasorArray._wrap(self._operand(other) / self._values)
+
+    def __iadd__(self, other):
+        np.add(self._values, self._operand(other), out=self._values)
+        return self._changed()
+
+    def __isub__(self, other):
+        np.subtract(self._values, self._operand(other), out=self._values)
+        return self._changed()
+
+    def __imul__(self, other):
+        np.multiply(self._values, self._operand(other), out=self._values)
+        return self._changed()
+
+    def __itruediv__(self, other):
+        np.divide(self._values, self._operand(other), out=self._values)
+        return self._changed()
 
 if __name__ == "__main__":
     pass
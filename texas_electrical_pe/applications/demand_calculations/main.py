@@ -1,3 +1,5 @@
+import numpy as np
+
 def annual_load_factor(average_load, peak_load):
     """
     Calculate the annual load factor.
@@ -94,5 +96,399 @@ def plant_factor(actual_output, maximum_output):
     
     return actual_output / maximum_output
 
+def _safe_ratio(numerator, denominator):
+    """
+    Divide element-wise, returning NaN wherever the denominator is zero.
+    """
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    out = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+def interval_load_profile(interval_demand, chunk_size=96):
+    """
+    Calculate per-meter and aggregate demand statistics from raw interval data in one pass.
+    
+    The data is read in blocks of chunk_size intervals, so a memory-mapped array or an
+    .npy file path never has to fit in memory. Losses are taken proportional to the
+    square of the demand when computing loss factors. Ratios with a zero peak (per meter
+    or for the system) are NaN.
+    
+    Parameters:
+    interval_demand (2D array of float or str): Average demand in kW per interval, shaped
+                                                (intervals x meters), or the path of an .npy file
+    chunk_size (int): Number of intervals processed per block
+    
+    Returns:
+    dict: Per-meter arrays ('meter_peak', 'meter_peak_interval', 'meter_average',
+          'meter_load_factor', 'meter_loss_factor', 'meter_coincident_demand') and aggregate
+          values ('system_peak', 'system_peak_interval', 'system_average', 'system_load_factor',
+          'system_loss_factor', 'sum_individual_peaks', 'coincidence_factor', 'diversity_factor')
+    """
+    if isinstance(interval_demand, str):
+        interval_demand = np.load(interval_demand, mmap_mode='r')
+    elif not isinstance(interval_demand, np.ndarray):
+        interval_demand = np.asarray(interval_demand, dtype=float)
+    if interval_demand.ndim != 2:
+        raise ValueError("Interval demand must be a 2D array of intervals x meters.")
+    intervals, meters = interval_demand.shape
+    if intervals == 0:
+        raise ValueError("Interval demand must contain at least one interval.")
+
+    meter_peak = np.full(meters, -np.inf)
+    meter_peak_interval = np.zeros(meters, dtype=np.int64)
+    meter_sum = np.zeros(meters)
+    meter_sum_squares = np.zeros(meters)
+    system_peak = -np.inf
+    system_peak_interval = 0
+    system_sum = 0.0
+    system_sum_squares = 0.0
+    meter_coincident_demand = np.zeros(meters)
+
+    for start in range(0, intervals, chunk_size):
+        block = np.asarray(interval_demand[start:start + chunk_size], dtype=float)
+
+        block_peak_index = block.argmax(axis=0)
+        block_peak = block[block_peak_index, np.arange(meters)]
+        update = block_peak > meter_peak
+        meter_peak[update] = block_peak[update]
+        meter_peak_interval[update] = block_peak_index[update] + start
+        meter_sum += block.sum(axis=0)
+        meter_sum_squares += np.einsum('ij,ij->j', block, block)
+
+        total = block.sum(axis=1)
+        system_sum += total.sum()
+        system_sum_squares += total @ total
+        peak_index = int(total.argmax())
+        if total[peak_index] > system_peak:
+            system_peak = total[peak_index]
+            system_peak_interval = start + peak_index
+            meter_coincident_demand[:] = block[peak_index]
+
+    meter_average = meter_sum / intervals
+    system_average = system_sum / intervals
+    sum_individual_peaks = meter_peak.sum()
+    return {
+        'meter_peak': meter_peak,
+        'meter_peak_interval': meter_peak_interval,
+        'meter_average': meter_average,
+        'meter_load_factor': _safe_ratio(meter_average, meter_peak),
+        'meter_loss_factor': _safe_ratio(meter_sum_squares / intervals, meter_peak ** 2),
+        'meter_coincident_demand': meter_coincident_demand,
+        'system_peak': system_peak,
+        'system_peak_interval': system_peak_interval,
+        'system_average': system_average,
+        'system_load_factor': float(_safe_ratio(system_average, system_peak)),
+        'system_loss_factor': float(_safe_ratio(system_sum_squares / intervals, system_peak ** 2)),
+        'sum_individual_peaks': sum_individual_peaks,
+        'coincidence_factor': float(_safe_ratio(system_peak, sum_individual_peaks)),
+        'diversity_factor': float(_safe_ratio(sum_individual_peaks, system_peak)),
+    }
+
+def _window_intervals(window_minutes, interval_minutes):
+    """
+    Convert a demand window in minutes to a whole number of intervals.
+    """
+    if interval_minutes <= 0 or window_minutes <= 0:
+        raise ValueError("Window and interval lengths must be greater than zero.")
+    window = window_minutes / interval_minutes
+    if window != int(window):
+        raise ValueError("Demand window must be a whole multiple of the interval length.")
+    return int(window)
+
+def rolling_demand(interval_demand, window_minutes=15, interval_minutes=15):
+    """
+    Calculate the sliding-window average demand of every meter.
+    
+    Parameters:
+    interval_demand (2D array of float): Average demand in kW per interval, shaped (intervals x meters)
+    window_minutes (float): Demand window in minutes, such as 15, 30 or 60
+    interval_minutes (float): Length of each interval in minutes
+    
+    Returns:
+    2D array of float: Rolling demand in kW, shaped (intervals - window + 1 x meters)
+    """
+    window = _window_intervals(window_minutes, interval_minutes)
+    interval_demand = np.asarray(interval_demand, dtype=float)
+    if interval_demand.ndim == 1:
+        interval_demand = interval_demand[:, np.newaxis]
+    cumulative = np.zeros((interval_demand.shape[0] + 1, interval_demand.shape[1]))
+    np.cumsum(interval_demand, axis=0, out=cumulative[1:])
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+def maximum_rolling_demand(interval_demand, window_minutes=15, interval_minutes=15, chunk_size=2880):
+    """
+    Calculate the maximum rolling demand of every meter, reading the data in blocks.
+    
+    Parameters:
+    interval_demand (2D array of float): Average demand in kW per interval, shaped
+                                         (intervals x meters); may be memory-mapped
+    window_minutes (float): Demand window in minutes, such as 15, 30 or 60
+    interval_minutes (float): Length of each interval in minutes
+    chunk_size (int): Number of intervals processed per block
+    
+    Returns:
+    tuple: Maximum rolling demand in kW and the index of the interval ending that window, per meter
+    """
+    window = _window_intervals(window_minutes, interval_minutes)
+    if not isinstance(interval_demand, np.ndarray):
+        interval_demand = np.asarray(interval_demand, dtype=float)
+    intervals = interval_demand.shape[0]
+    if intervals < window:
+        raise ValueError("Interval data is shorter than the demand window.")
+    meters = 1 if interval_demand.ndim == 1 else interval_demand.shape[1]
+    peak = np.full(meters, -np.inf)
+    peak_interval = np.zeros(meters, dtype=np.int64)
+    # Each block overlaps the previous one by window - 1 intervals so no window is missed
+    for start in range(0, intervals - window + 1, chunk_size):
+        block = rolling_demand(interval_demand[start:start + chunk_size + window - 1],
+                               window_minutes, interval_minutes)
+        block_index = block.argmax(axis=0)
+        block_peak = block[block_index, np.arange(meters)]
+        update = block_peak > peak
+        peak[update] = block_peak[update]
+        peak_interval[update] = start + block_index[update] + window - 1
+    return peak, peak_interval
+
+class IncrementalDemand:
+    """
+    Track rolling demand, peak demand and load factor for many meters from a live feed.
+    
+    Each call to update() takes one new interval for every meter and costs O(1) per
+    meter: the window sum is kept in a ring buffer and the running peak can only grow.
+    
+    Parameters:
+    meters (int): Number of meters
+    window_minutes (float): Demand window in minutes, such as 15, 30 or 60
+    interval_minutes (float): Length of each interval in minutes
+    """
+
+    def __init__(self, meters, window_minutes=15, interval_minutes=15):
+        self.window = _window_intervals(window_minutes, interval_minutes)
+        self.buffer = np.zeros((self.window, meters))
+        self.window_sum = np.zeros(meters)
+        self.energy_sum = np.zeros(meters)
+        self.peak = np.zeros(meters)
+        self.intervals = 0
+
+    def update(self, demand):
+        """
+        Add one interval of demand for every meter.
+        
+        Parameters:
+        demand (array of float): Average demand in kW of each meter over the new interval
+        
+        Returns:
+        array of float: Current rolling demand in kW (NaN until the first window is full)
+        """
+        demand = np.asarray(demand, dtype=float)
+        slot = self.intervals % self.window
+        self.window_sum += demand - self.buffer[slot]
+        self.buffer[slot] = demand
+        self.energy_sum += demand
+        self.intervals += 1
+        if slot == self.window - 1:
+            # Re-sum once per wrap so rounding errors cannot accumulate
+            self.window_sum = self.buffer.sum(axis=0)
+        if self.intervals < self.window:
+            return np.full(demand.shape, np.nan)
+        current = self.window_sum / self.window
+        np.maximum(self.peak, current, out=self.peak)
+        return current
+
+    @property
+    def average(self):
+        """
+        Average demand in kW of each meter over all intervals seen so far.
+        """
+        return self.energy_sum / max(self.intervals, 1)
+
+    @property
+    def load_factor(self):
+        """
+        Load factor of each meter so far (NaN where the peak is zero).
+        """
+        return _safe_ratio(self.average, self.peak)
+
+class LoadDurationSketch:
+    """
+    Mergeable quantile sketch of interval demand for building load-duration curves.
+    
+    Demand values are counted in logarithmically spaced bins, so every quantile is
+    within relative_accuracy of the true value and memory does not grow with the
+    number of intervals. Sketches covering different time periods of the same loads
+    (for example, blocks handled by different worker processes) are combined with
+    merge(). Exact peak, mean and mean-square demand are kept alongside the bins for
+    load and loss factors. Demand below min_demand, including exported power, is
+    counted at zero.
+    
+    Parameters:
+    series (int): Number of independent loads (meters, feeders) tracked side by side
+    relative_accuracy (float): Relative error bound of the quantiles
+    min_demand (float): Smallest demand in kW resolved by the bins
+    max_demand (float): Largest demand in kW resolved by the bins
+    """
+
+    def __init__(self, series=1, relative_accuracy=0.01, min_demand=1e-3, max_demand=1e7):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("Relative accuracy must be between zero and one.")
+        if not 0 < min_demand < max_demand:
+            raise ValueError("Minimum demand must be positive and below the maximum demand.")
+        self.series = series
+        self.relative_accuracy = relative_accuracy
+        self.min_demand = min_demand
+        self.max_demand = max_demand
+        self._log_gamma = np.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self._offset = int(np.floor(np.log(min_demand) / self._log_gamma))
+        # Bin 0 holds demand below min_demand; the last bin also takes anything above max_demand
+        self.bins = int(np.ceil(np.log(max_demand) / self._log_gamma)) - self._offset + 1
+        self.counts = np.zeros((series, self.bins), dtype=np.int64)
+        self.count = 0
+        self.total = np.zeros(series)
+        self.total_squares = np.zeros(series)
+        self.peak = np.full(series, -np.inf)
+
+    def update(self, demand):
+        """
+        Add intervals of demand to the sketch.
+        
+        Parameters:
+        demand (array of float): Demand in kW shaped (intervals,) or (intervals x series), all finite
+        
+        Returns:
+        LoadDurationSketch: This sketch
+        """
+        demand = np.asarray(demand, dtype=float).reshape(-1, self.series)
+        if not np.all(np.isfinite(demand)):
+            raise ValueError("Demand must be finite; fill or drop missing intervals before updating the sketch.")
+        with np.errstate(divide='ignore', invalid='ignore'):
+            index = np.ceil(np.log(demand) / self._log_gamma) - self._offset
+        index = np.where(demand < self.min_demand, 0, np.clip(index, 1, self.bins - 1)).astype(np.int64)
+        index += np.arange(self.series) * self.bins
+        self.counts += np.bincount(index.ravel(), minlength=self.series * self.bins).reshape(self.series, self.bins)
+        self.count += demand.shape[0]
+        self.total += demand.sum(axis=0)
+        self.total_squares += np.einsum('ij,ij->j', demand, demand)
+        np.maximum(self.peak, demand.max(axis=0, initial=-np.inf), out=self.peak)
+        return self
+
+    def merge(self, other):
+        """
+        Combine another sketch of the same loads into this one.
+        
+        Parameters:
+        other (LoadDurationSketch): Sketch built with the same parameters
+        
+        Returns:
+        LoadDurationSketch: This sketch
+        """
+        if (other.series, other.bins, other.relative_accuracy, other.min_demand) != \
+                (self.series, self.bins, self.relative_accuracy, self.min_demand):
+            raise ValueError("Only sketches with the same parameters can be merged.")
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+        np.maximum(self.peak, other.peak, out=self.peak)
+        return self
+
+    def quantile(self, q):
+        """
+        Estimate demand quantiles of every series.
+        
+        Parameters:
+        q (float or array of float): Quantiles between 0 and 1
+        
+        Returns:
+        array of float: Demand in kW shaped (quantiles x series), or (series,) for a scalar q
+        """
+        if self.count == 0:
+            raise ValueError("Sketch is empty.")
+        q = np.asarray(q, dtype=float)
+        rank = np.clip(q.reshape(-1, 1), 0, 1) * (self.count - 1)
+        # Offsetting each row by more than its total makes the flattened cumulative counts monotonic
+        row_offset = np.arange(self.series) * (self.count + 1)
+        cumulative = (np.cumsum(self.counts, axis=1) + row_offset[:, np.newaxis]).ravel()
+        position = np.searchsorted(cumulative, rank + row_offset, side='right')
+        index = position - np.arange(self.series) * self.bins + self._offset
+        value = 2 * np.exp(index * self._log_gamma) / (1 + np.exp(self._log_gamma))
+        value = np.where(position % self.bins == 0, 0.0, np.minimum(value, self.peak))
+        return value[0] if q.ndim == 0 else value
+
+    def load_duration_curve(self, points=101):
+        """
+        Build the load-duration curve of every series.
+        
+        Parameters:
+        points (int): Number of points between 0 % and 100 % of the time
+        
+        Returns:
+        tuple: Percent of time (array) and demand in kW equalled or exceeded for that
+               share of the time, shaped (points x series)
+        """
+        percent_time = np.linspace(0, 100, points)
+        return percent_time, self.quantile(1 - percent_time / 100)
+
+    @property
+    def average(self):
+        """
+        Average demand in kW of every series.
+        """
+        return self.total / max(self.count, 1)
+
+    @property
+    def load_factor(self):
+        """
+        Load factor of every series (NaN where the peak is zero).
+        """
+        return _safe_ratio(self.average, self.peak)
+
+    @property
+    def loss_factor(self):
+        """
+        Loss factor of every series, with losses proportional to the square of the demand.
+        """
+        return _safe_ratio(self.total_squares / max(self.count, 1), self.peak ** 2)
+
+def feeder_load_duration(interval_demand, feeder_index, chunk_size=96, **sketch_options):
+    """
+    Build feeder and system load-duration sketches from meter interval data in one pass.
+    
+    Meter demand is summed into feeder and system totals block by block, so only the
+    sketches are kept in memory.
+    
+    Parameters:
+    interval_demand (2D array of float or str): Average demand in kW per interval, shaped
+                                                (intervals x meters), or the path of an .npy file
+    feeder_index (array of int): Feeder number (0 to feeders - 1) of every meter
+    chunk_size (int): Number of intervals processed per block
+    sketch_options: Keyword arguments passed to LoadDurationSketch
+    
+    Returns:
+    tuple: Feeder sketch (one series per feeder) and system sketch
+    """
+    if isinstance(interval_demand, str):
+        interval_demand = np.load(interval_demand, mmap_mode='r')
+    elif not isinstance(interval_demand, np.ndarray):
+        interval_demand = np.asarray(interval_demand, dtype=float)
+    feeder_index = np.asarray(feeder_index)
+    if feeder_index.shape != (interval_demand.shape[1],):
+        raise ValueError("Every meter must have a feeder index.")
+    feeders = int(feeder_index.max()) + 1
+    order = np.argsort(feeder_index, kind='stable')
+    starts = np.searchsorted(feeder_index[order], np.arange(feeders))
+    present = np.bincount(feeder_index, minlength=feeders) > 0
+
+    feeder_sketch = LoadDurationSketch(series=feeders, **sketch_options)
+    system_sketch = LoadDurationSketch(series=1, **sketch_options)
+    for start in range(0, interval_demand.shape[0], chunk_size):
+        block = np.asarray(interval_demand[start:start + chunk_size], dtype=float)[:, order]
+        feeder_total = np.zeros((block.shape[0], feeders))
+        feeder_total[:, present] = np.add.reduceat(block, starts[present], axis=1)
+        feeder_sketch.update(feeder_total)
+        system_sketch.update(feeder_total.sum(axis=1))
+    return feeder_sketch, system_sketch
+
 if __name__ == "__main__":
     pass
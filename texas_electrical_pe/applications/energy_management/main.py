@@ -1,3 +1,43 @@
+import numpy as np
+
+# Size of each unit in the base unit of its dimension (J, W, VA or var)
+UNITS = {
+    'J': ('energy', 1),
+    'kJ': ('energy', 1e3),
+    'MJ': ('energy', 1e6),
+    'GJ': ('energy', 1e9),
+    'Wh': ('energy', 3600),
+    'kWh': ('energy', 3.6e6),
+    'MWh': ('energy', 3.6e9),
+    'GWh': ('energy', 3.6e12),
+    'BTU': ('energy', 1055.06),
+    'kBTU': ('energy', 1055.06e3),
+    'MMBtu': ('energy', 1055.06e6),
+    'therm': ('energy', 1055.06e5),
+    'ton-h': ('energy', 12000 * 1055.06),
+    'W': ('power', 1),
+    'kW': ('power', 1e3),
+    'MW': ('power', 1e6),
+    'GW': ('power', 1e9),
+    'hp': ('power', 745.7),
+    'BTU/h': ('power', 1055.06 / 3600),
+    'ton': ('power', 12000 * 1055.06 / 3600),
+    'VA': ('apparent power', 1),
+    'kVA': ('apparent power', 1e3),
+    'MVA': ('apparent power', 1e6),
+    'var': ('reactive power', 1),
+    'kvar': ('reactive power', 1e3),
+    'Mvar': ('reactive power', 1e6),
+}
+
+# Conversion factor for every pair of units with the same dimension, built once at import
+CONVERSION_FACTORS = {
+    (from_unit, to_unit): from_size / to_size
+    for from_unit, (from_dimension, from_size) in UNITS.items()
+    for to_unit, (to_dimension, to_size) in UNITS.items()
+    if from_dimension == to_dimension
+}
+
 def efficiency(output_energy, input_energy):
     """
     Calculate the efficiency of a system.
@@ -14,72 +54,88 @@ def efficiency(output_energy, input_energy):
     
     return (output_energy / input_energy) * 100
 
+def conversion_factor(from_unit, to_unit, dimension=None):
+    """
+    Look up the factor that converts values from one unit to another.
+    
+    Parameters:
+    from_unit (str): Current unit
+    to_unit (str): Desired unit
+    dimension (str): Required dimension of both units ('energy', 'power', 'apparent power'
+                     or 'reactive power'), or None to accept any
+    
+    Returns:
+    float: Conversion factor
+    """
+    if from_unit not in UNITS or to_unit not in UNITS:
+        raise ValueError("Invalid unit for conversion.")
+    if dimension is not None and (UNITS[from_unit][0] != dimension or UNITS[to_unit][0] != dimension):
+        raise ValueError(f"Units must both be units of {dimension}.")
+    if (from_unit, to_unit) not in CONVERSION_FACTORS:
+        raise ValueError(f"Cannot convert {UNITS[from_unit][0]} to {UNITS[to_unit][0]}.")
+    return CONVERSION_FACTORS[from_unit, to_unit]
+
+def convert(value, from_unit, to_unit, out=None):
+    """
+    Convert values between units of the same dimension.
+    
+    The units are checked once, then the whole array is converted with a single multiply.
+    
+    Parameters:
+    value (float or array of float): Values to be converted
+    from_unit (str): Current unit
+    to_unit (str): Desired unit
+    out (array of float): Array to write the result into, such as value itself, or None
+    
+    Returns:
+    float or array of float: Converted values
+    """
+    factor = conversion_factor(from_unit, to_unit)
+    if out is None and np.isscalar(value):
+        return value * factor
+    return np.multiply(value, factor, out=out)
+
 def energy_conversion(value, from_unit, to_unit):
     """
     Convert energy between different units.
     
     Parameters:
-    value (float): Value of energy to be converted
+    value (float or array of float): Value of energy to be converted
     from_unit (str): Current unit of energy
     to_unit (str): Desired unit of energy
     
     Returns:
-    float: Converted energy value
-    """
-    units = {
-        'J': 1,
-        'kJ': 1e3,
-        'MJ': 1e6,
-        'GJ': 1e9,
-        'Wh': 3600,
-        'kWh': 3.6e6,
-        'MWh': 3.6e9,
-        'GWh': 3.6e12,
-        'BTU': 1055.06,
-        'kBTU': 1055.06e3
-    }
-    
-    if from_unit not in units or to_unit not in units:
-        raise ValueError("Invalid unit for conversion.")
-    
-    return value * (units[to_unit] / units[from_unit])
+    float or array of float: Converted energy value
+    """
+    factor = conversion_factor(from_unit, to_unit, 'energy')
+    return value * factor if np.isscalar(value) else np.multiply(value, factor)
 
 def power_conversion(value, from_unit, to_unit):
     """
     Convert power between different units.
     
     Parameters:
-    value (float): Value of power to be converted
+    value (float or array of float): Value of power to be converted
     from_unit (str): Current unit of power
     to_unit (str): Desired unit of power
     
     Returns:
-    float: Converted power value
-    """
-    units = {
-        'W': 1,
-        'kW': 1e3,
-        'MW': 1e6,
-        'GW': 1e9,
-        'hp': 745.7
-    }
-    
-    if from_unit not in units or to_unit not in units:
-        raise ValueError("Invalid unit for conversion.")
-    
-    return value * (units[to_unit] / units[from_unit])
+    float or array of float: Converted power value
+    """
+    factor = conversion_factor(from_unit, to_unit, 'power')
+    return value * factor if np.isscalar(value) else np.multiply(value, factor)
 
 def doubling_time(growth_rate):
     """
     Calculate the doubling time given the growth rate.
     
     Parameters:
-    growth_rate (float): Growth rate as a percentage
+    growth_rate (float or array of float): Growth rate as a percentage
     
     Returns:
-    float: Doubling time in years
+    float or array of float: Doubling time in years
     """
-    if growth_rate <= 0:
+    if np.any(np.asarray(growth_rate) <= 0):
         raise ValueError("Growth rate must be greater than zero.")
     
     return 70 / growth_rate
@@ -89,17 +145,126 @@ def per_unit_growth_rate(initial_value, final_value, periods):
     Calculate the per-unit growth rate.
     
     Parameters:
-    initial_value (float): Initial value
-    final_value (float): Final value
-    periods (int): Number of periods
+    initial_value (float or array of float): Initial value
+    final_value (float or array of float): Final value
+    periods (int or array of int): Number of periods
     
     Returns:
-    float: Per-unit growth rate
+    float or array of float: Per-unit growth rate
     """
-    if initial_value == 0 or periods == 0:
+    if np.any(np.asarray(initial_value) == 0) or np.any(np.asarray(periods) == 0):
         raise ValueError("Initial value and periods must be greater than zero.")
     
     return ((final_value / initial_value) ** (1 / periods)) - 1
 
+def forecast_peak_growth(peaks, years=None, ratings=None, horizon=10):
+    """
+    Fit compound growth to the annual peak history of many feeders and project it forward.
+    
+    Each feeder is fitted by least squares of ln(peak) against the year, all feeders at
+    once. Missing (NaN) and non-positive peaks are ignored; feeders with fewer than two
+    valid years get NaN results, and exceeds_rating is False for them.
+    
+    Parameters:
+    peaks (2D array of float): Annual peak demand shaped (feeders x years)
+    years (array of float): Year of every column, or None for 0, 1, 2, ...
+    ratings (array of float): Rating of every feeder in the units of peaks, or None
+    horizon (int): Number of years to project past the last historical year
+    
+    Returns:
+    dict: Per-unit growth rate, doubling time in years (infinite without growth), fitted
+          peak in the last historical year, projected peaks shaped (feeders x horizon) with
+          their 'forecast_years', and, with ratings, the year each feeder reaches its rating
+          and whether that happens within the horizon
+    """
+    peaks = np.atleast_2d(np.asarray(peaks, dtype=float))
+    years = np.arange(peaks.shape[1], dtype=float) if years is None else np.asarray(years, dtype=float)
+    valid = np.isfinite(peaks) & (peaks > 0)
+    log_peaks = np.log(np.where(valid, peaks, 1.0))
+    t = np.where(valid, years - years[0], 0.0)
+
+    n = valid.sum(axis=1)
+    sum_t = t.sum(axis=1)
+    sum_y = np.where(valid, log_peaks, 0.0).sum(axis=1)
+    sum_tt = (t * t).sum(axis=1)
+    sum_ty = (t * np.where(valid, log_peaks, 0.0)).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sum_ty - sum_t * sum_y) / (n * sum_tt - sum_t ** 2)
+        intercept = (sum_y - slope * sum_t) / n
+    slope[n < 2] = np.nan
+    intercept[n < 2] = np.nan
+
+    forecast_years = years[-1] + np.arange(1, horizon + 1)
+    growing = slope > 0
+    unknown = n < 2
+    result = {
+        'growth_rate': np.expm1(slope),
+        'doubling_time': np.where(unknown, np.nan, np.where(growing, np.log(2) / np.where(growing, slope, 1.0), np.inf)),
+        'fitted_peak': np.exp(intercept + slope * (years[-1] - years[0])),
+        'forecast_years': forecast_years,
+        'projected_peaks': np.exp(intercept[:, np.newaxis] + slope[:, np.newaxis] * (forecast_years - years[0])),
+    }
+    if ratings is not None:
+        ratings = np.broadcast_to(np.asarray(ratings, dtype=float), slope.shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing = years[0] + (np.log(ratings) - intercept) / slope
+        overloaded = result['fitted_peak'] >= ratings
+        crossing = np.where(overloaded, np.minimum(crossing, years[-1]), np.where(growing, crossing, np.inf))
+        crossing[unknown] = np.nan
+        result['rating_year'] = crossing
+        result['exceeds_rating'] = crossing <= forecast_years[-1]
+    return result
+
+def fleet_efficiency(output_energy, input_energy, energy_cost=0.0, asset_class=None):
+    """
+    Calculate efficiency, loss energy and loss cost for a fleet of equipment.
+    
+    Intervals with zero, negative or non-finite input energy, or non-finite output
+    energy, are masked instead of raising, and left out of every total.
+    
+    Parameters:
+    output_energy (array of float): Output energy shaped (assets x intervals) or (assets,)
+    input_energy (array of float): Input energy in the same shape and units as output_energy
+    energy_cost (float or array of float): Cost per unit of energy, broadcast against the inputs
+    asset_class (array): Class label of every asset (such as 'pad-mount', 'motor'), or None
+    
+    Returns:
+    dict: Masked arrays of efficiency as a percentage, loss energy and loss cost, and per-asset
+          totals of input, output, loss and loss cost; with asset_class, also the class labels
+          and their totals and overall efficiency as a percentage under 'classes'
+    """
+    output_energy = np.asarray(output_energy, dtype=float)
+    input_energy = np.asarray(input_energy, dtype=float)
+    if output_energy.shape != input_energy.shape:
+        raise ValueError("Output and input energy must have the same shape.")
+    invalid = ~(np.isfinite(input_energy) & np.isfinite(output_energy) & (input_energy > 0))
+    output_energy = np.ma.masked_array(output_energy, invalid)
+    input_energy = np.ma.masked_array(input_energy, invalid)
+
+    loss = input_energy - output_energy
+    loss_cost = loss * energy_cost
+    axis = tuple(range(1, output_energy.ndim))
+    totals = {
+        'input': input_energy.sum(axis=axis).filled(0.0),
+        'output': output_energy.sum(axis=axis).filled(0.0),
+        'loss': loss.sum(axis=axis).filled(0.0),
+        'loss_cost': loss_cost.sum(axis=axis).filled(0.0),
+    }
+    result = {
+        'efficiency': output_energy / input_energy * 100,
+        'loss': loss,
+        'loss_cost': loss_cost,
+        'totals': totals,
+    }
+    if asset_class is not None:
+        labels, index = np.unique(np.asarray(asset_class), return_inverse=True)
+        classes = {key: np.bincount(index, weights=np.ravel(value), minlength=labels.size)
+                   for key, value in totals.items()}
+        classes['labels'] = labels
+        classes['efficiency'] = np.divide(classes['output'] * 100, classes['input'],
+                                          out=np.full(labels.size, np.nan), where=classes['input'] > 0)
+        result['classes'] = classes
+    return result
+
 if __name__ == "__main__":
     pass
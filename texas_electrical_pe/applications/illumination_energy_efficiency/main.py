@@ -1,18 +1,26 @@
+import json
 import math
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from texas_electrical_pe.applications.energy_management.main import energy_conversion, power_conversion
+from texas_electrical_pe.applications.engineering_economics.main import uniform_series_present_worth
 
 def lamberts_law(I0, theta):
     """
     Calculate the illumination using Lambert's law.
     
     Parameters:
-    I0 (float): Initial intensity in candela (cd)
-    theta (float): Angle of incidence in degrees (°)
+    I0 (float or array of float): Initial intensity in candela (cd)
+    theta (float or array of float): Angle of incidence in degrees (°)
     
     Returns:
-    float: Illumination in lux (lx)
+    float or array of float: Illumination in lux (lx)
     """
-    theta_radians = math.radians(theta)
-    return I0 * math.cos(theta_radians)
+    return I0 * np.cos(np.radians(theta))
 
 def light_loss_factor(initial_illumination, maintained_illumination):
     """
@@ -68,7 +76,7 @@ def cavity_ratio(height, length, width):
     Returns:
     float: Cavity ratio
     """
-    return 2.5 * height * (length + width) / (length * width)
+    return 5 * height * (length + width) / (length * width)
 
 def room_cavity_ratio(room_height, length, width):
     """
@@ -82,7 +90,7 @@ def room_cavity_ratio(room_height, length, width):
     Returns:
     float: Room cavity ratio
     """
-    return 2.5 * room_height * (length + width) / (length * width)
+    return 5 * room_height * (length + width) / (length * width)
 
 def ceiling_cavity_ratio(ceiling_height, room_height, length, width):
     """
@@ -97,7 +105,7 @@ def ceiling_cavity_ratio(ceiling_height, room_height, length, width):
     Returns:
     float: Ceiling cavity ratio
     """
-    return 2.5 * (ceiling_height - room_height) * (length + width) / (length * width)
+    return 5 * (ceiling_height - room_height) * (length + width) / (length * width)
 
 def floor_cavity_ratio(floor_height, room_height, length, width):
     """
@@ -112,7 +120,7 @@ def floor_cavity_ratio(floor_height, room_height, length, width):
     Returns:
     float: Floor cavity ratio
     """
-    return 2.5 * (room_height - floor_height) * (length + width) / (length * width)
+    return 5 * (room_height - floor_height) * (length + width) / (length * width)
 
 def minimum_maintained_illumination_level(initial_illumination, light_loss_factor):
     """
@@ -172,5 +180,558 @@ def floodlight_requirement(area, illuminance):
     required_flux = illuminance * area
     return math.ceil(required_flux / luminous_flux_per_floodlight)
 
+def interpolate_candela(c_angles, gamma_angles, candela, c, gamma):
+    """
+    Interpolate a photometric intensity table bilinearly.
+    
+    Tables covering only C = 0°, 0–90°, 0–180° or 0–360° are unfolded using the
+    usual rotational, quadrant and bilateral symmetries. Directions beyond the last
+    vertical angle of the table get zero intensity.
+    
+    Parameters:
+    c_angles (array of float): Horizontal (C-plane) angles of the table in degrees, ascending
+    gamma_angles (array of float): Vertical angles of the table in degrees, ascending
+    candela (2D array of float): Intensity in candela (cd), shaped (C angles x vertical angles)
+    c (array of float): Horizontal angles to evaluate in degrees
+    gamma (array of float): Vertical angles to evaluate in degrees
+    
+    Returns:
+    array of float: Intensity in candela (cd)
+    """
+    c_angles = np.asarray(c_angles, dtype=float)
+    gamma_angles = np.asarray(gamma_angles, dtype=float)
+    candela = np.asarray(candela, dtype=float).reshape(c_angles.size, gamma_angles.size)
+    c = np.mod(c, 360.0)
+    gamma = np.asarray(gamma, dtype=float)
+
+    span = c_angles[-1] - c_angles[0]
+    if c_angles.size == 1:
+        c = np.zeros_like(c)
+    elif span == 90:
+        c = np.where(c > 180, 360 - c, c)
+        c = np.where(c > 90, 180 - c, c)
+    elif span == 180 and c_angles[0] == 0:
+        c = np.where(c > 180, 360 - c, c)
+    elif span == 180:
+        # Bilateral symmetry about the 90–270° plane
+        c = np.where(c < 90, 180 - c, np.where(c > 270, 540 - c, c))
+    c = np.clip(c, c_angles[0], c_angles[-1])
+
+    def weights(axis, values):
+        if axis.size == 1:
+            return np.zeros(values.shape, dtype=np.int64), np.zeros(values.shape)
+        step = axis[1] - axis[0]
+        if np.allclose(np.diff(axis), step):
+            # Regular grids (see resample_candela) are indexed directly instead of searched
+            index = np.clip(((values - axis[0]) // step).astype(np.int64), 0, axis.size - 2)
+        else:
+            index = np.clip(np.searchsorted(axis, values, side='right') - 1, 0, axis.size - 2)
+        fraction = (values - axis[index]) / (axis[index + 1] - axis[index])
+        return index, np.clip(fraction, 0, 1)
+
+    ci, cf = weights(c_angles, c)
+    gi, gf = weights(gamma_angles, np.clip(gamma, gamma_angles[0], gamma_angles[-1]))
+    c_next = np.minimum(ci + 1, c_angles.size - 1)
+    g_next = np.minimum(gi + 1, gamma_angles.size - 1)
+    intensity = ((1 - cf) * ((1 - gf) * candela[ci, gi] + gf * candela[ci, g_next])
+                 + cf * ((1 - gf) * candela[c_next, gi] + gf * candela[c_next, g_next]))
+    return np.where(gamma > gamma_angles[-1], 0.0, intensity)
+
+def _luminaire_frames(positions, aim_points, orientation):
+    """
+    Build the photometric axes of every luminaire.
+    
+    Returns:
+    tuple: Unit vectors of the vertical axis (gamma = 0°), the C = 0° direction and the C = 90° direction
+    """
+    if aim_points is None:
+        axis = np.broadcast_to([0.0, 0.0, -1.0], positions.shape).copy()
+    else:
+        axis = np.asarray(aim_points, dtype=float) - positions
+    axis /= np.linalg.norm(axis, axis=1, keepdims=True)
+    orientation = np.radians(np.broadcast_to(np.asarray(orientation, dtype=float), positions.shape[:1]))
+    reference = np.stack([np.cos(orientation), np.sin(orientation), np.zeros_like(orientation)], axis=1)
+    c0 = reference - np.sum(reference * axis, axis=1, keepdims=True) * axis
+    norm = np.linalg.norm(c0, axis=1, keepdims=True)
+    # A luminaire aimed along its reference direction falls back to a vertical C = 0° plane
+    fallback = np.cross(axis, np.cross([0.0, 0.0, 1.0], axis))
+    c0 = np.where(norm > 1e-9, c0 / np.where(norm > 1e-9, norm, 1), fallback)
+    c0 /= np.linalg.norm(c0, axis=1, keepdims=True)
+    return axis, c0, np.cross(c0, axis)
+
+def point_illuminance(points, luminaire_positions, c_angles, gamma_angles, candela,
+                      aim_points=None, orientation=0, normal=(0, 0, 1), multiplier=1, chunk_size=10000):
+    """
+    Calculate the illuminance at every point of a grid by the point-by-point method.
+    
+    Each luminaire contributes I(C, gamma) * cos(theta) / d², where theta is the angle of
+    incidence on the calculation plane and d the distance to the point.
+    
+    Parameters:
+    points (2D array of float): Calculation point coordinates in meters (m), shaped (points x 3)
+    luminaire_positions (2D array of float): Luminaire coordinates in meters (m), shaped (luminaires x 3)
+    c_angles (array of float): Horizontal (C-plane) angles of the intensity table in degrees
+    gamma_angles (array of float): Vertical angles of the intensity table in degrees
+    candela (2D array of float): Intensity in candela (cd), shaped (C angles x vertical angles)
+    aim_points (2D array of float): Point each luminaire is aimed at, or None for straight down
+    orientation (float or array of float): Azimuth of the C = 0° plane of each luminaire in degrees (°)
+    normal (array of float): Normal of the calculation plane, per point or shared
+    multiplier (float or array of float): Intensity multiplier per luminaire, such as the light loss factor
+    chunk_size (int): Number of points evaluated per block
+    
+    Returns:
+    array of float: Illuminance in lux (lx) at every point
+    """
+    points = np.atleast_2d(np.asarray(points, dtype=float))
+    positions = np.atleast_2d(np.asarray(luminaire_positions, dtype=float))
+    normal = np.broadcast_to(np.asarray(normal, dtype=float), points.shape)
+    normal = normal / np.linalg.norm(normal, axis=1, keepdims=True)
+    multiplier = np.broadcast_to(np.asarray(multiplier, dtype=float), positions.shape[:1])
+    axis, c0, c90 = _luminaire_frames(positions, aim_points, orientation)
+
+    illuminance = np.empty(points.shape[0])
+    for start in range(0, points.shape[0], chunk_size):
+        block = points[start:start + chunk_size]
+        vector = block[:, np.newaxis, :] - positions[np.newaxis, :, :]
+        distance_squared = np.einsum('pld,pld->pl', vector, vector)
+        direction = vector / np.sqrt(distance_squared)[..., np.newaxis]
+        cos_gamma = np.clip(np.einsum('pld,ld->pl', direction, axis), -1, 1)
+        gamma = np.degrees(np.arccos(cos_gamma))
+        c = np.degrees(np.arctan2(np.einsum('pld,ld->pl', direction, c90),
+                                  np.einsum('pld,ld->pl', direction, c0)))
+        intensity = interpolate_candela(c_angles, gamma_angles, candela, c, gamma) * multiplier
+        cos_theta = -np.einsum('pld,pd->pl', direction, normal[start:start + chunk_size])
+        illuminance[start:start + chunk_size] = np.sum(
+            intensity * np.clip(cos_theta, 0, None) / distance_squared, axis=1)
+    return illuminance
+
+def illuminance_uniformity(illuminance):
+    """
+    Calculate the uniformity ratios of a calculation grid.
+    
+    Parameters:
+    illuminance (array of float): Illuminance in lux (lx) at every grid point
+    
+    Returns:
+    dict: Average, minimum and maximum illuminance in lux (lx) and the
+          minimum/average, minimum/maximum, maximum/minimum and maximum/average ratios
+    """
+    illuminance = np.asarray(illuminance, dtype=float)
+    average = illuminance.mean()
+    minimum = illuminance.min()
+    maximum = illuminance.max()
+    if average == 0:
+        raise ValueError("Average illuminance cannot be zero.")
+    return {
+        'average': average,
+        'minimum': minimum,
+        'maximum': maximum,
+        'min_to_avg': minimum / average,
+        'min_to_max': minimum / maximum,
+        'max_to_min': maximum / minimum if minimum > 0 else math.inf,
+        'max_to_avg': maximum / average,
+    }
+
+def parse_ies(text):
+    """
+    Parse the contents of an IES LM-63 photometric file.
+    
+    Candela values are returned with the candela multiplier applied. Tilt data given
+    in a separate file (TILT=<filename>) is not read.
+    
+    Parameters:
+    text (str): Contents of the file
+    
+    Returns:
+    dict: Keywords, lamp and luminaire data, tilt data, 'vertical_angles' and
+          'horizontal_angles' in degrees (°) and 'candela' in candela (cd), shaped
+          (horizontal angles x vertical angles)
+    """
+    lines = text.splitlines()
+    keywords = {}
+    for number, line in enumerate(lines):
+        if line.strip().upper().startswith('TILT='):
+            break
+        match = re.match(r'\s*\[(\w+)\]\s*(.*)', line)
+        if match:
+            keywords[match.group(1).upper()] = match.group(2).strip()
+    else:
+        raise ValueError("IES file has no TILT line.")
+
+    tilt = lines[number].split('=', 1)[1].strip()
+    values = np.array(' '.join(lines[number + 1:]).replace(',', ' ').split(), dtype=float)
+    position = 0
+    tilt_data = None
+    if tilt.upper() == 'INCLUDE':
+        pairs = int(values[1])
+        tilt_data = {
+            'geometry': int(values[0]),
+            'angles': values[2:2 + pairs],
+            'multipliers': values[2 + pairs:2 + 2 * pairs],
+        }
+        position = 2 + 2 * pairs
+
+    header = values[position:position + 13]
+    if header.size < 13:
+        raise ValueError("IES file is missing photometric data.")
+    vertical_count, horizontal_count = int(header[3]), int(header[4])
+    position += 13
+    vertical_angles = values[position:position + vertical_count]
+    position += vertical_count
+    horizontal_angles = values[position:position + horizontal_count]
+    position += horizontal_count
+    candela = values[position:position + vertical_count * horizontal_count]
+    if candela.size != vertical_count * horizontal_count:
+        raise ValueError("IES file has fewer candela values than its angles require.")
+
+    return {
+        'keywords': keywords,
+        'tilt': tilt,
+        'tilt_data': tilt_data,
+        'lamps': int(header[0]),
+        'lumens_per_lamp': header[1],
+        'candela_multiplier': header[2],
+        'photometric_type': int(header[5]),
+        'units_type': int(header[6]),
+        'width': header[7],
+        'length': header[8],
+        'height': header[9],
+        'ballast_factor': header[10],
+        'input_watts': header[12],
+        'vertical_angles': vertical_angles,
+        'horizontal_angles': horizontal_angles,
+        'candela': candela.reshape(horizontal_count, vertical_count) * header[2],
+    }
+
+@lru_cache(maxsize=4096)
+def _load_ies_cached(path, modified):
+    with open(path, encoding='latin-1') as file:
+        photometry = parse_ies(file.read())
+    for key in ('vertical_angles', 'horizontal_angles', 'candela'):
+        photometry[key].setflags(write=False)
+    if photometry['tilt_data'] is not None:
+        for key in ('angles', 'multipliers'):
+            photometry['tilt_data'][key].setflags(write=False)
+    return photometry
+
+def load_ies(path):
+    """
+    Load an IES LM-63 photometric file, reusing the parsed result while the file is unchanged.
+    
+    Parsed files are kept in a least-recently-used cache keyed by path and modification
+    time. Each call returns its own copy of the dictionaries, but the arrays are shared
+    between callers and therefore read-only.
+    
+    Parameters:
+    path (str): Path of the file
+    
+    Returns:
+    dict: Photometric data as returned by parse_ies
+    """
+    path = os.path.abspath(path)
+    photometry = dict(_load_ies_cached(path, os.stat(path).st_mtime_ns))
+    photometry['keywords'] = dict(photometry['keywords'])
+    if photometry['tilt_data'] is not None:
+        photometry['tilt_data'] = dict(photometry['tilt_data'])
+    return photometry
+
+def regular_angles(c_step=1.0, gamma_step=0.5):
+    """
+    Return the horizontal and vertical angles of a regular 0–360° by 0–180° candela grid.
+    
+    Parameters:
+    c_step (float): Horizontal angle step in degrees (°)
+    gamma_step (float): Vertical angle step in degrees (°)
+    
+    Returns:
+    tuple: Horizontal angles and vertical angles in degrees (°)
+    """
+    return (np.linspace(0, 360, int(round(360 / c_step)) + 1),
+            np.linspace(0, 180, int(round(180 / gamma_step)) + 1))
+
+def resample_candela(photometry, c_step=1.0, gamma_step=0.5):
+    """
+    Resample a photometric table onto a regular full-sphere grid.
+    
+    Symmetries are unfolded once, so later lookups in the grid use direct indexing.
+    
+    Parameters:
+    photometry (dict): Photometric data as returned by parse_ies or load_ies
+    c_step (float): Horizontal angle step in degrees (°)
+    gamma_step (float): Vertical angle step in degrees (°)
+    
+    Returns:
+    2D array of float: Intensity in candela (cd), shaped (horizontal angles x vertical angles)
+    """
+    c, gamma = regular_angles(c_step, gamma_step)
+    return interpolate_candela(photometry['horizontal_angles'], photometry['vertical_angles'],
+                               photometry['candela'], c[:, np.newaxis], gamma[np.newaxis, :])
+
+def write_candela_archive(paths, archive_path, c_step=1.0, gamma_step=0.5):
+    """
+    Resample many IES files into one .npy archive that worker processes can memory-map.
+    
+    An index is written next to the archive as <archive_path>.json.
+    
+    Parameters:
+    paths (list of str): Paths of the IES files
+    archive_path (str): Path of the .npy archive to write
+    c_step (float): Horizontal angle step in degrees (°)
+    gamma_step (float): Vertical angle step in degrees (°)
+    
+    Returns:
+    dict: Row of the archive for every file path
+    """
+    c, gamma = regular_angles(c_step, gamma_step)
+    grids = np.lib.format.open_memmap(archive_path, mode='w+', dtype=np.float32,
+                                      shape=(len(paths), c.size, gamma.size))
+    files = {}
+    for row, path in enumerate(paths):
+        grids[row] = resample_candela(load_ies(path), c_step, gamma_step)
+        files[os.path.abspath(path)] = {'row': row, 'modified': os.stat(path).st_mtime_ns}
+    grids.flush()
+    with open(archive_path + '.json', 'w') as file:
+        json.dump({'c_step': c_step, 'gamma_step': gamma_step, 'files': files}, file)
+    return {path: entry['row'] for path, entry in files.items()}
+
+def open_candela_archive(archive_path):
+    """
+    Memory-map a candela archive written by write_candela_archive.
+    
+    Every process that opens the archive shares the same pages of the operating
+    system cache instead of holding its own copy.
+    
+    Parameters:
+    archive_path (str): Path of the .npy archive
+    
+    Returns:
+    tuple: Read-only grids shaped (files x horizontal angles x vertical angles), horizontal
+           angles, vertical angles, and the archive index
+    """
+    with open(archive_path + '.json') as file:
+        index = json.load(file)
+    c, gamma = regular_angles(index['c_step'], index['gamma_step'])
+    return np.load(archive_path, mmap_mode='r'), c, gamma, index
+
+def effective_cavity_reflectance(base_reflectance, wall_reflectance, cavity_height, length, width):
+    """
+    Calculate the effective reflectance of a ceiling or floor cavity.
+    
+    Parameters:
+    base_reflectance (float or array of float): Reflectance of the ceiling or floor surface
+    wall_reflectance (float or array of float): Reflectance of the cavity walls
+    cavity_height (float or array of float): Height of the cavity in meters (m)
+    length (float or array of float): Length of the room in meters (m)
+    width (float or array of float): Width of the room in meters (m)
+    
+    Returns:
+    float or array of float: Effective cavity reflectance
+    """
+    opening_area = np.asarray(length, dtype=float) * width
+    wall_area = 2 * np.asarray(cavity_height, dtype=float) * (np.asarray(length, dtype=float) + width)
+    surface_area = opening_area + wall_area
+    average = (base_reflectance * opening_area + wall_reflectance * wall_area) / surface_area
+    return average * opening_area / (surface_area - average * surface_area + average * opening_area)
+
+def interpolate_coefficient_of_utilization(rcr_values, ceiling_reflectances, wall_reflectances, cu_table,
+                                           rcr, ceiling_reflectance, wall_reflectance):
+    """
+    Interpolate coefficients of utilization linearly in RCR and in ceiling and wall reflectance.
+    
+    Parameters:
+    rcr_values (array of float): Room cavity ratios of the table rows
+    ceiling_reflectances (array of float): Effective ceiling cavity reflectances of the table
+    wall_reflectances (array of float): Wall reflectances of the table
+    cu_table (3D array of float): Coefficients of utilization shaped (RCR x ceiling x wall)
+    rcr (array of float): Room cavity ratio of every room
+    ceiling_reflectance (array of float): Effective ceiling cavity reflectance of every room
+    wall_reflectance (array of float): Wall reflectance of every room
+    
+    Returns:
+    array of float: Coefficient of utilization of every room
+    """
+    cu_table = np.asarray(cu_table, dtype=float)
+    index, fraction = [], []
+    for axis_number, (axis, values) in enumerate(
+            ((rcr_values, rcr), (ceiling_reflectances, ceiling_reflectance), (wall_reflectances, wall_reflectance))):
+        axis = np.asarray(axis, dtype=float)
+        # Manufacturer tables usually list reflectances in descending order
+        if axis.size > 1 and axis[0] > axis[-1]:
+            axis = axis[::-1]
+            cu_table = np.flip(cu_table, axis=axis_number)
+        values = np.clip(np.asarray(values, dtype=float), axis[0], axis[-1])
+        if axis.size == 1:
+            index.append(np.zeros(values.shape, dtype=np.int64))
+            fraction.append(np.zeros(values.shape))
+            continue
+        i = np.clip(np.searchsorted(axis, values, side='right') - 1, 0, axis.size - 2)
+        index.append(i)
+        fraction.append((values - axis[i]) / (axis[i + 1] - axis[i]))
+
+    shape = np.array(cu_table.shape) - 1
+    cu = 0.0
+    for corner in np.ndindex(2, 2, 2):
+        weight = 1.0
+        position = []
+        for i, f, step, limit in zip(index, fraction, corner, shape):
+            weight = weight * (f if step else 1 - f)
+            position.append(np.minimum(i + step, limit))
+        cu = cu + weight * cu_table[tuple(position)]
+    return cu
+
+def lumen_method_design(length, width, ceiling_height, luminaire_height, work_plane_height,
+                        ceiling_reflectance, wall_reflectance, floor_reflectance,
+                        target_illuminance, luminaire_lumens, luminaire_watts, light_loss_factor,
+                        rcr_values, ceiling_reflectances, wall_reflectances, cu_table):
+    """
+    Lay out luminaires for many rooms at once by the zonal-cavity lumen method.
+    
+    Every room argument may be an array with one entry per room, such as the columns
+    of a room schedule. The CU table is taken to be for a 20 % effective floor cavity
+    reflectance; no floor cavity correction is applied.
+    
+    Parameters:
+    length (array of float): Length of each room in meters (m)
+    width (array of float): Width of each room in meters (m)
+    ceiling_height (array of float): Height of the ceiling above the floor in meters (m)
+    luminaire_height (array of float): Mounting height of the luminaires above the floor in meters (m)
+    work_plane_height (array of float): Height of the work plane above the floor in meters (m)
+    ceiling_reflectance (array of float): Ceiling reflectance
+    wall_reflectance (array of float): Wall reflectance
+    floor_reflectance (array of float): Floor reflectance
+    target_illuminance (array of float): Required maintained illuminance in lux (lx)
+    luminaire_lumens (array of float): Initial lumens per luminaire (lm)
+    luminaire_watts (array of float): Input power per luminaire in watts (W)
+    light_loss_factor (array of float): Light loss factor
+    rcr_values, ceiling_reflectances, wall_reflectances, cu_table: CU table as described
+        in interpolate_coefficient_of_utilization
+    
+    Returns:
+    dict: Arrays of RCR, CCR, FCR, effective ceiling and floor cavity reflectances, CU,
+          luminaire count, maintained illuminance in lux (lx) and lighting power density in W/m²
+    """
+    length = np.asarray(length, dtype=float)
+    width = np.asarray(width, dtype=float)
+    ceiling_cavity_height = np.asarray(ceiling_height, dtype=float) - luminaire_height
+    room_cavity_height = np.asarray(luminaire_height, dtype=float) - work_plane_height
+    floor_cavity_height = np.asarray(work_plane_height, dtype=float)
+    area = length * width
+
+    rcr = room_cavity_ratio(room_cavity_height, length, width)
+    ceiling_cavity_reflectance = effective_cavity_reflectance(
+        ceiling_reflectance, wall_reflectance, ceiling_cavity_height, length, width)
+    floor_cavity_reflectance = effective_cavity_reflectance(
+        floor_reflectance, wall_reflectance, floor_cavity_height, length, width)
+    cu = interpolate_coefficient_of_utilization(
+        rcr_values, ceiling_reflectances, wall_reflectances, cu_table,
+        rcr, ceiling_cavity_reflectance, wall_reflectance)
+
+    lumens_per_luminaire = np.asarray(luminaire_lumens, dtype=float) * cu * light_loss_factor
+    count = np.ceil(luminous_flux(target_illuminance, area) / lumens_per_luminaire)
+    maintained = minimum_maintained_illumination_level(
+        initial_illumination(count * luminaire_lumens * cu, area), light_loss_factor)
+    return {
+        'room_cavity_ratio': rcr,
+        'ceiling_cavity_ratio': cavity_ratio(ceiling_cavity_height, length, width),
+        'floor_cavity_ratio': cavity_ratio(floor_cavity_height, length, width),
+        'ceiling_cavity_reflectance': ceiling_cavity_reflectance,
+        'floor_cavity_reflectance': floor_cavity_reflectance,
+        'coefficient_of_utilization': cu,
+        'luminaires': count.astype(np.int64),
+        'maintained_illuminance': maintained,
+        'lighting_power_density': count * luminaire_watts / area,
+    }
+
+def lighting_energy_use(fixtures, watts, schedules, schedule_index=None, energy_unit='kWh', power_unit='kW'):
+    """
+    Simulate the hourly demand and annual energy of lighting scenarios.
+    
+    The demand of every scenario is the fixture power of each zone weighted by the
+    hourly schedule of that zone, summed over all zones. Scenarios sharing a schedule
+    are evaluated together as one matrix product.
+    
+    Parameters:
+    fixtures (2D array of float): Number of fixtures shaped (scenarios x zones)
+    watts (float or array of float): Input power per fixture in watts (W), broadcast to (scenarios x zones)
+    schedules (array of float): Fraction of full power in each hour (dimming x occupancy), shaped
+                                (hours x zones) or (schedules x hours x zones)
+    schedule_index (array of int): Schedule used by each scenario, or None to use the first
+    energy_unit (str): Unit of the annual energy, as accepted by energy_conversion
+    power_unit (str): Unit of the demand, as accepted by power_conversion
+    
+    Returns:
+    tuple: Annual energy per scenario, peak demand per scenario, and hourly demand shaped (hours x scenarios)
+    """
+    fixtures = np.atleast_2d(np.asarray(fixtures, dtype=float))
+    load = fixtures * np.asarray(watts, dtype=float)
+    schedules = np.asarray(schedules)
+    if schedules.ndim == 2:
+        schedules = schedules[np.newaxis]
+    if schedules.shape[2] != load.shape[1]:
+        raise ValueError("Schedules must have one column per zone.")
+    if schedule_index is None:
+        schedule_index = np.zeros(load.shape[0], dtype=np.int64)
+    schedule_index = np.asarray(schedule_index)
+
+    hourly = np.empty((schedules.shape[1], load.shape[0]))
+    for profile in np.unique(schedule_index):
+        scenarios = schedule_index == profile
+        hourly[:, scenarios] = schedules[profile] @ load[scenarios].T
+    # One-hour steps: the sum of the hourly demand in W is the energy in Wh
+    energy = energy_conversion(hourly.sum(axis=0), 'Wh', energy_unit)
+    hourly = power_conversion(hourly, 'W', power_unit)
+    return energy, hourly.max(axis=0), hourly
+
+def _monthly_peaks(hourly_demand):
+    """
+    Return the peak demand of every calendar month from 8760 or 8784 hourly values.
+    """
+    hours = hourly_demand.shape[0]
+    if hours not in (8760, 8784):
+        raise ValueError("Hourly demand must cover one calendar year (8760 or 8784 hours).")
+    days = [31, 29 if hours == 8784 else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    month_starts = np.concatenate([[0], np.cumsum(days)[:-1]]) * 24
+    return np.maximum.reduceat(hourly_demand, month_starts, axis=0)
+
+def lighting_retrofit_savings(baseline_hourly, retrofit_hourly, energy_rate, demand_rate,
+                              installed_cost, interest_rate, years):
+    """
+    Evaluate the savings and economics of lighting retrofit scenarios against a baseline.
+    
+    Demand savings are billed on the difference between the monthly peaks.
+    
+    Parameters:
+    baseline_hourly (array of float): Hourly baseline demand in kW, shaped (hours,) or (hours x 1)
+    retrofit_hourly (2D array of float): Hourly demand in kW of each scenario, shaped (hours x scenarios)
+    energy_rate (float): Energy charge in $/kWh
+    demand_rate (float): Demand charge in $/kW-month
+    installed_cost (float or array of float): Installed cost of each scenario in $
+    interest_rate (float): Interest rate per year
+    years (int): Study period in years
+    
+    Returns:
+    dict: Arrays per scenario of annual energy savings in kWh, peak demand savings in kW,
+          annual cost savings in $, present worth of the savings in $, net present worth in $
+          and benefit-cost ratio
+    """
+    baseline_hourly = np.asarray(baseline_hourly, dtype=float).reshape(-1, 1)
+    retrofit_hourly = np.asarray(retrofit_hourly, dtype=float)
+    energy_savings = baseline_hourly.sum(axis=0) - retrofit_hourly.sum(axis=0)
+    peak_savings = baseline_hourly.max(axis=0) - retrofit_hourly.max(axis=0)
+    monthly_demand_savings = (_monthly_peaks(baseline_hourly) - _monthly_peaks(retrofit_hourly)).sum(axis=0)
+    annual_savings = energy_savings * energy_rate + monthly_demand_savings * demand_rate
+    present_worth = uniform_series_present_worth(annual_savings, interest_rate, years)
+    installed_cost = np.broadcast_to(np.asarray(installed_cost, dtype=float), annual_savings.shape)
+    benefit_cost = np.full(annual_savings.shape, np.inf)
+    np.divide(present_worth, installed_cost, out=benefit_cost, where=installed_cost != 0)
+    return {
+        'energy_savings': energy_savings,
+        'peak_demand_savings': peak_savings,
+        'annual_savings': annual_savings,
+        'present_worth': present_worth,
+        'net_present_worth': present_worth - installed_cost,
+        'benefit_cost_ratio': benefit_cost,
+    }
+
 if __name__ == "__main__":
     pass
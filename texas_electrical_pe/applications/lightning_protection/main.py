@@ -1,4 +1,7 @@
 import math
+from functools import lru_cache
+
+import numpy as np
 
 def annual_lightning_strike_frequency(Ng, Ae, C):
     """
@@ -33,16 +36,310 @@ def tolerable_lightning_frequency(Nd, Nc):
     Calculate the tolerable lightning frequency.
     
     Parameters:
-    Nd (float): Number of dangerous events per year
-    Nc (float): Number of tolerated lightning strikes per year
+    Nd (float or array of float): Number of dangerous events per year
+    Nc (float or array of float): Number of tolerated lightning strikes per year
     
     Returns:
-    float: Tolerable lightning frequency
+    float or array of float: Tolerable lightning frequency
     """
-    if Nc == 0:
+    if np.any(np.asarray(Nc) == 0):
         raise ValueError("Number of tolerated lightning strikes per year cannot be zero.")
     
     return Nd / Nc
 
+def flash_density_lookup(x, y, flash_density, origin, cell_size, nodata=None):
+    """
+    Look up the ground flash density raster cell of every structure.
+    
+    The raster is indexed directly from the coordinates, with row 0 at the top edge
+    (the largest y), as in GeoTIFF grids.
+    
+    Parameters:
+    x (array of float): Easting of each structure in meters (m)
+    y (array of float): Northing of each structure in meters (m)
+    flash_density (2D array of float): Ground flash density (flashes per square kilometer per year)
+    origin (tuple of float): Coordinates of the top-left corner of the raster in meters (m)
+    cell_size (float or tuple of float): Cell width and height in meters (m)
+    nodata (float): Raster value marking missing data, or None
+    
+    Returns:
+    tuple: Ground flash density of every structure (NaN outside the raster or on nodata
+           cells) and the (row, column) cell indices
+    """
+    flash_density = np.asarray(flash_density, dtype=float)
+    cell_width, cell_height = np.broadcast_to(np.asarray(cell_size, dtype=float), (2,))
+    column = np.floor((np.asarray(x, dtype=float) - origin[0]) / cell_width).astype(np.int64)
+    row = np.floor((origin[1] - np.asarray(y, dtype=float)) / cell_height).astype(np.int64)
+    inside = (row >= 0) & (row < flash_density.shape[0]) & (column >= 0) & (column < flash_density.shape[1])
+    Ng = np.where(inside, flash_density[np.where(inside, row, 0), np.where(inside, column, 0)], np.nan)
+    if nodata is not None:
+        Ng[Ng == nodata] = np.nan
+    return Ng, (row, column)
+
+def lightning_risk_assessment(length, width, height, x, y, flash_density, origin, cell_size,
+                              location_factor=1.0, structure_coefficient=1.0, nodata=None):
+    """
+    Assess the need for lightning protection of many rectangular structures at once.
+    
+    The tolerable frequency is Nc = 1.5e-3 / C, where C is the product of the construction,
+    contents, occupancy and consequence coefficients. Protection is required where the
+    expected strike frequency Nd exceeds Nc.
+    
+    Parameters:
+    length (array of float): Length of each structure in meters (m)
+    width (array of float): Width of each structure in meters (m)
+    height (array of float): Height of each structure in meters (m)
+    x (array of float): Easting of each structure in meters (m)
+    y (array of float): Northing of each structure in meters (m)
+    flash_density (2D array of float): Ground flash density raster (flashes per square kilometer per year)
+    origin (tuple of float): Coordinates of the top-left corner of the raster in meters (m)
+    cell_size (float or tuple of float): Raster cell width and height in meters (m)
+    location_factor (array of float): Environment (location) factor C1 of each structure
+    structure_coefficient (array of float): Product of the C2 to C5 coefficients of each structure
+    nodata (float): Raster value marking missing data, or None
+    
+    Returns:
+    dict: Arrays of Ng, Ae in square meters (m²), Nd and Nc per year, the ratio Nd / Nc and
+          whether protection is required (False where Ng is unknown)
+    """
+    Ng, _ = flash_density_lookup(x, y, flash_density, origin, cell_size, nodata)
+    Ae = equivalent_collection_area(np.asarray(length, dtype=float), np.asarray(width, dtype=float),
+                                    np.asarray(height, dtype=float))
+    # Ae is in m² and Ng per km²
+    Nd = annual_lightning_strike_frequency(Ng, Ae * 1e-6, location_factor)
+    Nc = 1.5e-3 / np.broadcast_to(np.asarray(structure_coefficient, dtype=float), Nd.shape)
+    ratio = tolerable_lightning_frequency(Nd, Nc)
+    return {
+        'Ng': Ng,
+        'Ae': Ae,
+        'Nd': Nd,
+        'Nc': Nc,
+        'risk_ratio': ratio,
+        'protection_required': ratio > 1,
+    }
+
+def _distance_to_footprint(points, vertices):
+    """
+    Distance from every point to a polygon footprint (zero inside it), a line or a single point.
+    """
+    if len(vertices) == 1:
+        return np.hypot(points[:, 0] - vertices[0, 0], points[:, 1] - vertices[0, 1])
+    start = vertices
+    end = np.roll(vertices, -1, axis=0) if len(vertices) > 2 else vertices[::-1]
+    edge = end - start
+    length_squared = np.maximum(np.einsum('ij,ij->i', edge, edge), 1e-300)
+    relative = points[:, np.newaxis, :] - start[np.newaxis, :, :]
+    t = np.clip(np.einsum('pej,ej->pe', relative, edge) / length_squared, 0, 1)
+    nearest = relative - t[..., np.newaxis] * edge
+    distance = np.sqrt(np.einsum('pej,pej->pe', nearest, nearest).min(axis=1))
+    if len(vertices) > 2:
+        # Even-odd rule: count edges crossed by a ray in the +x direction
+        y = points[:, np.newaxis, 1]
+        spans = (start[:, 1] > y) != (end[:, 1] > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing_x = start[:, 0] + (y - start[:, 1]) * edge[:, 0] / edge[:, 1]
+        inside = np.count_nonzero(spans & (points[:, np.newaxis, 0] < crossing_x), axis=1) % 2 == 1
+        distance[inside] = 0.0
+    return distance
+
+@lru_cache(maxsize=1024)
+def _collection_area_cached(parts, resolution):
+    parts = [(np.array(vertices, dtype=float).reshape(-1, 2), height) for vertices, height in parts]
+    low = np.min([vertices.min(axis=0) - height for vertices, height in parts], axis=0)
+    high = np.max([vertices.max(axis=0) + height for vertices, height in parts], axis=0)
+    columns, rows = np.ceil((high - low) / resolution).astype(int) + 1
+    covered = np.zeros((rows, columns), dtype=bool)
+    for vertices, height in parts:
+        # Only the cells within reach of this part are tested
+        first = np.floor((vertices.min(axis=0) - height - low) / resolution).astype(int)
+        last = np.ceil((vertices.max(axis=0) + height - low) / resolution).astype(int)
+        first, last = np.maximum(first, 0), np.minimum(last, [columns - 1, rows - 1])
+        cx = low[0] + (np.arange(first[0], last[0] + 1) + 0.5) * resolution
+        for row in range(first[1], last[1] + 1):
+            cy = np.full(cx.shape, low[1] + (row + 0.5) * resolution)
+            reached = _distance_to_footprint(np.column_stack([cx, cy]), vertices) <= height
+            covered[row, first[0]:last[0] + 1] |= reached
+    return float(np.count_nonzero(covered)) * resolution ** 2
+
+def footprint_collection_area(parts, resolution=0.5):
+    """
+    Calculate the equivalent collection area of a structure of arbitrary shape.
+    
+    The structure is made of parts, each a footprint polygon, a line (two vertices) or
+    a point (one vertex, such as a mast) with its own height. Each part collects strikes
+    within a distance equal to its height, as in equivalent_collection_area, and the
+    collection area is the union of those zones, measured on a grid of the given
+    resolution. Results are cached by geometry, so repeated structures are computed once.
+    
+    Parameters:
+    parts (list of tuple): (vertices, height) pairs, with vertices as (x, y) coordinates
+                           in meters (m) and height in meters (m)
+    resolution (float): Grid cell size in meters (m)
+    
+    Returns:
+    float: Equivalent collection area in square meters (m²)
+    """
+    if resolution <= 0:
+        raise ValueError("Resolution must be greater than zero.")
+    key = tuple((tuple(map(tuple, np.asarray(vertices, dtype=float).reshape(-1, 2).round(6))), float(height))
+                for vertices, height in parts)
+    if not key:
+        raise ValueError("At least one part is required.")
+    return _collection_area_cached(key, float(resolution))
+
+def striking_distance(current):
+    """
+    Calculate the striking distance of a lightning stroke (IEEE 998 electrogeometric model).
+    
+    Parameters:
+    current (float or array of float): Stroke current in kiloamperes (kA)
+    
+    Returns:
+    float or array of float: Striking distance in meters (m)
+    """
+    return 8 * np.asarray(current, dtype=float) ** 0.65
+
+def stroke_current_probability(current):
+    """
+    Calculate the probability that a stroke current exceeds the given value.
+    
+    Parameters:
+    current (float or array of float): Stroke current in kiloamperes (kA)
+    
+    Returns:
+    float or array of float: Probability of exceeding the current
+    """
+    return 1 / (1 + (np.asarray(current, dtype=float) / 31) ** 2.6)
+
+def _shield_points(masts, shield_wires, spacing):
+    """
+    Return the tops of masts and points along shield wires as one (points x 3) array.
+    """
+    points = [np.empty((0, 3))]
+    if masts is not None:
+        points.append(np.asarray(masts, dtype=float).reshape(-1, 3))
+    if shield_wires is not None:
+        for start, end in np.asarray(shield_wires, dtype=float).reshape(-1, 2, 3):
+            samples = max(int(np.ceil(np.linalg.norm(end - start) / spacing)), 1) + 1
+            points.append(start + np.linspace(0, 1, samples)[:, np.newaxis] * (end - start))
+    return np.concatenate(points)
+
+def rolling_sphere_exposure(protected_points, radius, masts=None, shield_wires=None, resolution=1.0,
+                            chunk_size=2000):
+    """
+    Find which points are exposed to strikes by the rolling-sphere method.
+    
+    The lowest height a sphere centre can reach is tabulated on a horizontal grid, which
+    also serves as the spatial index: each mast top and shield wire point only raises
+    the cells within one radius of it. A point is exposed when a reachable sphere centre
+    lies within one radius of it. The sphere is taken to come from above, so space under
+    shield wires is treated as unreachable. Mast bodies are represented by their tops.
+    
+    Parameters:
+    protected_points (2D array of float): (x, y, z) of the points to check in meters (m),
+                                          such as equipment or the cells of a 3D grid
+    radius (float): Sphere radius (striking distance) in meters (m)
+    masts (2D array of float): (x, y, height) of every mast in meters (m)
+    shield_wires (3D array of float): Pairs of (x, y, z) attachment points of every shield wire in meters (m)
+    resolution (float): Horizontal grid spacing in meters (m)
+    chunk_size (int): Number of points checked per block
+    
+    Returns:
+    array of bool: Whether each point is exposed
+    """
+    points = np.atleast_2d(np.asarray(protected_points, dtype=float))
+    shields = _shield_points(masts, shield_wires, resolution / 2)
+    reach = int(np.ceil(radius / resolution))
+    low = np.minimum(points[:, :2].min(axis=0), shields[:, :2].min(axis=0, initial=np.inf)) - (reach + 1) * resolution
+    high = np.maximum(points[:, :2].max(axis=0), shields[:, :2].max(axis=0, initial=-np.inf)) + (reach + 1) * resolution
+    columns, rows = np.ceil((high - low) / resolution).astype(int) + 1
+    centre_x = low[0] + np.arange(columns) * resolution
+    centre_y = low[1] + np.arange(rows) * resolution
+
+    lowest_centre = np.full((rows, columns), float(radius))
+    for x, y, z in shields:
+        column, row = int(round((x - low[0]) / resolution)), int(round((y - low[1]) / resolution))
+        window = (slice(row - reach, row + reach + 1), slice(column - reach, column + reach + 1))
+        horizontal = np.hypot(centre_x[window[1]][np.newaxis, :] - x, centre_y[window[0]][:, np.newaxis] - y)
+        blocked = z + np.sqrt(np.clip(radius ** 2 - horizontal ** 2, 0, None))
+        blocked[horizontal >= radius] = -np.inf
+        np.maximum(lowest_centre[window], blocked, out=lowest_centre[window])
+
+    # Large spheres check every stride-th column, keeping about 80 columns across the sphere,
+    # then every column around the closest strided one. The offsets are symmetric about the
+    # point's own column and always include the ±reach edge.
+    stride = max(1, int(np.ceil(reach / 40)))
+    steps = np.arange(0, reach + 1, stride)
+    if steps[-1] != reach:
+        steps = np.append(steps, reach)
+    steps = np.concatenate([-steps[:0:-1], steps])
+    offset_row, offset_column = np.meshgrid(steps, steps, indexing='ij')
+    inside = np.hypot(offset_row, offset_column) * resolution <= radius + resolution * stride
+    offset_row, offset_column = offset_row[inside], offset_column[inside]
+    fine_row, fine_column = (offsets.ravel() for offsets in np.mgrid[1 - stride:stride, 1 - stride:stride])
+    flat_lowest = lowest_centre.ravel()
+
+    def squared_distance(block, row, column, offset_row, offset_column):
+        dx = (centre_x[column] - block[:, 0])[:, np.newaxis] + offset_column * resolution
+        dy = (centre_y[row] - block[:, 1])[:, np.newaxis] + offset_row * resolution
+        dz = np.maximum(flat_lowest[(row * columns + column)[:, np.newaxis] + (offset_row * columns + offset_column)]
+                        - block[:, 2:3], 0)
+        return dx * dx + dy * dy + dz * dz
+
+    exposed = np.empty(points.shape[0], dtype=bool)
+    for start in range(0, points.shape[0], chunk_size):
+        block = points[start:start + chunk_size]
+        row = np.rint((block[:, 1] - low[1]) / resolution).astype(int)
+        column = np.rint((block[:, 0] - low[0]) / resolution).astype(int)
+        distance = squared_distance(block, row, column, offset_row, offset_column)
+        if stride > 1:
+            best = distance.argmin(axis=1)
+            near_row = np.clip(offset_row[best][:, np.newaxis] + fine_row, -reach, reach)
+            near_column = np.clip(offset_column[best][:, np.newaxis] + fine_column, -reach, reach)
+            distance = np.minimum(distance.min(axis=1), squared_distance(block, row, column, near_row, near_column).min(axis=1))
+        else:
+            distance = distance.min(axis=1)
+        exposed[start:start + chunk_size] = distance <= radius ** 2
+    return exposed
+
+def shielding_failure_rate(protected_points, point_area, Ng, masts=None, shield_wires=None,
+                           currents=np.arange(2.0, 62.0, 2.0), resolution=1.0, C=1.0):
+    """
+    Estimate the expected number of shielding failures per year with the electrogeometric model.
+    
+    For each stroke current band, the exposed area is found with a sphere of that band's
+    striking distance, and the strike frequency to it is weighted by the probability of
+    a stroke current in that band.
+    
+    Parameters:
+    protected_points (2D array of float): (x, y, z) of the points representing protected equipment in meters (m)
+    point_area (float or array of float): Plan area represented by each point in square meters (m²)
+    Ng (float): Ground flash density (flashes per square kilometer per year)
+    masts (2D array of float): (x, y, height) of every mast in meters (m)
+    shield_wires (3D array of float): Pairs of (x, y, z) attachment points of every shield wire in meters (m)
+    currents (array of float): Edges of the stroke current bands in kiloamperes (kA), ascending
+    resolution (float): Horizontal grid spacing in meters (m)
+    C (float): Environment factor
+    
+    Returns:
+    dict: Shielding failures per year, and the exposed area in square meters (m²) and
+          failures per year of each current band
+    """
+    currents = np.asarray(currents, dtype=float)
+    point_area = np.broadcast_to(np.asarray(point_area, dtype=float), (np.atleast_2d(protected_points).shape[0],))
+    band_probability = stroke_current_probability(currents[:-1]) - stroke_current_probability(currents[1:])
+    exposed_area = np.empty(currents.size - 1)
+    for band, (lower, upper) in enumerate(zip(currents[:-1], currents[1:])):
+        radius = striking_distance((lower + upper) / 2)
+        exposed = rolling_sphere_exposure(protected_points, radius, masts, shield_wires, resolution)
+        exposed_area[band] = point_area[exposed].sum()
+    failures = annual_lightning_strike_frequency(Ng, exposed_area * 1e-6, C) * band_probability
+    return {
+        'failures_per_year': failures.sum(),
+        'band_currents': currents,
+        'band_exposed_area': exposed_area,
+        'band_failures_per_year': failures,
+    }
+
 if __name__ == "__main__":
     pass
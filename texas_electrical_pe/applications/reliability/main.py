@@ -1,17 +1,32 @@
-def reliability_series(components):
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+HOURS_PER_YEAR = 8760
+
+def reliability_series(components, log_space=False, return_log=False, axis=0):
     """
     Calculate the reliability of independent components connected in series.
     
     Parameters:
-    components (list of float): List of reliabilities of individual components
+    components (array of float): Reliabilities of individual components, optionally with
+                                  extra dimensions such as (components x times)
+    log_space (bool): Accumulate the product as a sum of logarithms, which keeps precision
+                      for many near-1 reliabilities
+    return_log (bool): Return the natural logarithm of the system reliability, which avoids
+                       underflow for very large systems (implies log_space)
+    axis (int): Axis along which the components are arranged
     
     Returns:
-    float: System reliability
+    float or array of float: System reliability (or its logarithm)
     """
-    reliability = 1.0
-    for r in components:
-        reliability *= r
-    return reliability
+    components = np.asarray(components, dtype=float)
+    if not (log_space or return_log):
+        return np.prod(components, axis=axis)
+    with np.errstate(divide='ignore'):
+        log_reliability = np.sum(np.log(components), axis=axis)
+    return log_reliability if return_log else np.exp(log_reliability)
 
 def reliability_parallel(components):
     """
@@ -47,29 +62,166 @@ def calculate_reliability(mttf, time):
     """
     Calculate the reliability of a system.
     
+    Arrays are broadcast against each other, so passing mttf[:, None] and time[None, :]
+    returns a whole (components x times) reliability curve in one operation.
+    
     Parameters:
-    mttf (float): Mean time to failure
-    time (float): Time period for which reliability is calculated
+    mttf (float or array of float): Mean time to failure
+    time (float or array of float): Time period for which reliability is calculated
     
     Returns:
-    float: Reliability
+    float or array of float: Reliability
     """
-    return math.exp(-time / mttf)
+    return np.exp(-np.asarray(time, dtype=float) / np.asarray(mttf, dtype=float))
 
 def system_availability(mtbf, mttr):
     """
     Calculate the system availability.
     
     Parameters:
-    mtbf (float): Mean time between failures
-    mttr (float): Mean time to repair
+    mtbf (float or array of float): Mean time between failures
+    mttr (float or array of float): Mean time to repair
     
     Returns:
-    float: System availability
+    float or array of float: System availability
     """
-    if mtbf + mttr == 0:
+    mtbf = np.asarray(mtbf, dtype=float)
+    total = mtbf + np.asarray(mttr, dtype=float)
+    if np.any(total == 0):
         raise ValueError("Sum of MTBF and MTTR cannot be zero.")
-    return mtbf / (mtbf + mttr)
+    return mtbf / total
+
+def sample_lifetimes(mean_times, rng, shape=None):
+    """
+    Sample component lifetimes (times to failure or times to repair).
+    
+    Parameters:
+    mean_times (array of float): Mean time for each sample
+    rng (numpy.random.Generator): Random number generator
+    shape (float or array of float): Weibull shape parameter, or None for exponential times
+    
+    Returns:
+    array of float: Sampled times in the same units as mean_times
+    """
+    mean_times = np.asarray(mean_times, dtype=float)
+    if shape is None:
+        return rng.exponential(mean_times)
+    shape = np.broadcast_to(np.asarray(shape, dtype=float), mean_times.shape)
+    # Scale the unit Weibull so that its mean equals mean_times
+    unique_shapes, inverse = np.unique(shape, return_inverse=True)
+    gamma = np.array([math.gamma(1 + 1 / k) for k in unique_shapes])[inverse].reshape(shape.shape)
+    return mean_times / gamma * rng.weibull(shape)
+
+def _simulate_years(failure_rates, repair_times, customers, load, years, seed, failure_shape, repair_shape):
+    """
+    Simulate a block of consecutive years for every component at once.
+    
+    Each component follows one chronological failure/repair timeline through the block,
+    so ageing carries over from one year to the next. The timeline starts five mean
+    lifetimes before the first year, which brings Weibull components close to their
+    long-run renewal state before any events are counted. Each pass of the loop
+    processes one failure/repair cycle for every component still inside the block.
+    
+    Returns:
+    tuple: Customer interruptions, customer-hours and unserved energy per simulated year
+    """
+    rng = np.random.default_rng(seed)
+    n = failure_rates.size
+    mttf = HOURS_PER_YEAR / failure_rates
+    horizon = years * HOURS_PER_YEAR
+
+    def shape_of(shape, c):
+        return None if shape is None else np.broadcast_to(np.asarray(shape, dtype=float), (n,))[c]
+
+    interruptions = np.zeros(years)
+    customer_hours = np.zeros(years)
+    unserved_energy = np.zeros(years)
+
+    component = np.arange(n)
+    next_failure = sample_lifetimes(mttf, rng, shape_of(failure_shape, component)) - 5 * mttf
+    active = np.flatnonzero(next_failure < horizon)
+    while active.size:
+        c = active
+        start = next_failure[c]
+        repair = sample_lifetimes(repair_times[c], rng, shape_of(repair_shape, c))
+        end = start + repair
+        # Outages are charged to the year they start in; warm-up outages only for their part after t=0
+        counted = end > 0
+        y = (np.maximum(start[counted], 0) // HOURS_PER_YEAR).astype(int)
+        cc = c[counted]
+        duration = np.minimum(end[counted], horizon) - np.maximum(start[counted], 0)
+        interruptions += np.bincount(y, weights=customers[cc] * (start[counted] >= 0), minlength=years)
+        customer_hours += np.bincount(y, weights=customers[cc] * duration, minlength=years)
+        unserved_energy += np.bincount(y, weights=load[cc] * duration, minlength=years)
+        next_failure[c] = end + sample_lifetimes(mttf[c], rng, shape_of(failure_shape, c))
+        active = active[next_failure[active] < horizon]
+    return interruptions, customer_hours, unserved_energy
+
+def monte_carlo_reliability_indices(failure_rates, repair_times, customers, load, total_customers,
+                                    years=1000, seed=None, workers=1, years_per_task=100,
+                                    failure_shape=None, repair_shape=None):
+    """
+    Estimate feeder reliability indices with a sequential Monte Carlo simulation.
+    
+    Each component alternates between operating and repair states along a chronological
+    timeline of 8760-hour years. An outage of a component interrupts its customers and
+    load for the duration of the repair, charged to the year it starts in. Overlapping
+    outages are counted independently.
+    
+    Parameters:
+    failure_rates (array of float): Failure rate of each component in failures per year
+    repair_times (array of float): Mean time to repair of each component in hours
+    customers (array of float): Number of customers interrupted by an outage of each component
+    load (array of float): Load in kW interrupted by an outage of each component
+    total_customers (float): Total number of customers served by the feeder
+    years (int): Number of simulated years
+    seed (int): Seed for reproducible results, independent of the number of workers
+    workers (int): Number of worker processes (1 runs in the current process)
+    years_per_task (int): Number of years simulated per task
+    failure_shape (float or array of float): Weibull shape for times to failure, or None for exponential
+    repair_shape (float or array of float): Weibull shape for times to repair, or None for exponential
+    
+    Returns:
+    dict: Mean SAIFI (interruptions/customer/yr), SAIDI (h/customer/yr), CAIDI (h/interruption),
+          EENS (kWh/yr), and the annual values under 'annual'
+    """
+    if total_customers <= 0:
+        raise ValueError("Total number of customers must be greater than zero.")
+    if years <= 0:
+        raise ValueError("Number of simulated years must be greater than zero.")
+
+    failure_rates = np.asarray(failure_rates, dtype=float)
+    n = failure_rates.size
+    repair_times = np.broadcast_to(np.asarray(repair_times, dtype=float), (n,))
+    customers = np.broadcast_to(np.asarray(customers, dtype=float), (n,))
+    load = np.broadcast_to(np.asarray(load, dtype=float), (n,))
+    if np.any(failure_rates <= 0):
+        raise ValueError("Failure rates must be greater than zero.")
+
+    # One child seed per task keeps the results identical for any number of workers
+    blocks = [min(years_per_task, years - start) for start in range(0, years, years_per_task)]
+    seeds = np.random.SeedSequence(seed).spawn(len(blocks))
+    tasks = [(failure_rates, repair_times, customers, load, block, block_seed, failure_shape, repair_shape)
+             for block, block_seed in zip(blocks, seeds)]
+
+    if workers == 1:
+        results = [_simulate_years(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_simulate_years, *zip(*tasks)))
+
+    interruptions, customer_hours, unserved_energy = (np.concatenate(r) for r in zip(*results))
+    saifi = interruptions / total_customers
+    saidi = customer_hours / total_customers
+    mean_saifi = saifi.mean()
+    mean_saidi = saidi.mean()
+    return {
+        'SAIFI': mean_saifi,
+        'SAIDI': mean_saidi,
+        'CAIDI': mean_saidi / mean_saifi if mean_saifi > 0 else 0.0,
+        'EENS': unserved_energy.mean(),
+        'annual': {'SAIFI': saifi, 'SAIDI': saidi, 'EENS': unserved_energy},
+    }
 
 if __name__ == "__main__":
     pass
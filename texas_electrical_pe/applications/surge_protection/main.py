@@ -1,15 +1,18 @@
 import math
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 
 def surge_impedance_loading(V, Zc):
     """
     Calculate the surge impedance loading.
     
     Parameters:
-    V (float): Voltage in volts (V)
-    Zc (float): Characteristic impedance in ohms (Ω)
+    V (float or array of float): Voltage in volts (V)
+    Zc (float or array of float): Characteristic impedance in ohms (Ω)
     
     Returns:
-    float: Surge impedance loading in watts (W)
+    float or array of float: Surge impedance loading in watts (W)
     """
     return V**2 / Zc
 
@@ -18,26 +21,69 @@ def characteristic_impedance(L, C):
     Calculate the characteristic impedance of a transmission line.
     
     Parameters:
-    L (float): Inductance per unit length in henries per meter (H/m)
-    C (float): Capacitance per unit length in farads per meter (F/m)
+    L (float or array of float): Inductance per unit length in henries per meter (H/m)
+    C (float or array of float): Capacitance per unit length in farads per meter (F/m)
+    
+    Returns:
+    float or array of float: Characteristic impedance in ohms (Ω)
+    """
+    return np.sqrt(np.asarray(L, dtype=float) / C)
+
+def line_loadability(L, C, length, V, R=0.0, G=0.0, f=60.0, max_angle=44.0, thermal_limit=3.0):
+    """
+    Calculate surge impedance, SIL and loadability of many transmission lines.
+    
+    Loadability follows the St. Clair curve in simplified form: the stability limit of a
+    lossless line with max_angle across it, sin(max_angle) / sin(beta * length) times SIL
+    (44° gives the usual 30 % stability margin), capped at thermal_limit times SIL for short
+    lines. Every line is computed in one vectorized pass, which is cheaper than looking up
+    unchanged lines in a cache, so re-rating studies simply rerun the whole table.
+    
+    Parameters:
+    L (array of float): Inductance per unit length in henries per meter (H/m)
+    C (array of float): Capacitance per unit length in farads per meter (F/m)
+    length (array of float): Line length in meters (m)
+    V (array of float): Line-to-line voltage in volts (V)
+    R (array of float): Resistance per unit length in ohms per meter (Ω/m)
+    G (array of float): Conductance per unit length in siemens per meter (S/m)
+    f (float): System frequency in hertz (Hz)
+    max_angle (float): Angle across the line at the stability limit in degrees (°)
+    thermal_limit (float): Largest loadability as a multiple of SIL
     
     Returns:
-    float: Characteristic impedance in ohms (Ω)
+    dict: Arrays of lossless Zc in ohms (Ω), complex Zc with losses, SIL in watts (W), electrical
+          length in degrees (°), loadability as a multiple of SIL and loadability in watts (W)
     """
-    return math.sqrt(L / C)
+    L, C, R, G, length, V, f = (np.atleast_1d(value) for value in
+                                np.broadcast_arrays(*[np.asarray(value, dtype=float) for value in (L, C, R, G, length, V, f)]))
+    omega = 2 * math.pi * f
+    Zc = characteristic_impedance(L, C)
+    electrical_length = omega * np.sqrt(L * C) * length
+    with np.errstate(divide='ignore'):
+        stability = np.sin(np.radians(max_angle)) / np.sin(np.minimum(electrical_length, math.pi / 2))
+    loadability = np.minimum(stability, thermal_limit)
+    SIL = surge_impedance_loading(V, Zc)
+    return {
+        'Zc': Zc,
+        'Zc_complex': np.sqrt((R + 1j * omega * L) / (G + 1j * omega * C)),
+        'SIL': SIL,
+        'electrical_length': np.degrees(electrical_length),
+        'loadability_sil': loadability,
+        'loadability': loadability * SIL,
+    }
 
 def protection_quality_index(protected_value, unprotected_value):
     """
     Calculate the protection quality index.
     
     Parameters:
-    protected_value (float): Value of the protected parameter
-    unprotected_value (float): Value of the unprotected parameter
+    protected_value (float or array of float): Value of the protected parameter
+    unprotected_value (float or array of float): Value of the unprotected parameter
     
     Returns:
-    float: Protection quality index
+    float or array of float: Protection quality index
     """
-    if unprotected_value == 0:
+    if np.any(np.asarray(unprotected_value) == 0):
         raise ValueError("Unprotected value cannot be zero.")
     
     return protected_value / unprotected_value
@@ -47,13 +93,242 @@ def protective_margin(design_margin, actual_margin):
     Calculate the protective margin.
     
     Parameters:
-    design_margin (float): Design margin
-    actual_margin (float): Actual margin
+    design_margin (float or array of float): Design margin
+    actual_margin (float or array of float): Actual margin
     
     Returns:
-    float: Protective margin
+    float or array of float: Protective margin
     """
     return design_margin - actual_margin
 
+def arrester_margin_screening(bil, bsl, chopped_wave_withstand, front_of_wave_level, lightning_level,
+                              switching_level, lead_length, rate_of_rise, lead_inductance=1.3e-6,
+                              required_margins=(20.0, 20.0, 15.0), worst=None):
+    """
+    Screen the protective margins of many apparatus-arrester pairs (IEEE C62.22).
+    
+    Every argument holds one entry per pair. The lead voltage L * length * di/dt is added
+    to the front-of-wave and lightning protective levels. Margins are
+    (withstand / protective level - 1) * 100 for the chopped wave, full lightning wave
+    and switching surge.
+    
+    Parameters:
+    bil (array of float): Basic lightning impulse insulation level of the apparatus in kV
+    bsl (array of float): Basic switching impulse insulation level of the apparatus in kV
+    chopped_wave_withstand (array of float): Chopped-wave withstand of the apparatus in kV
+    front_of_wave_level (array of float): Front-of-wave protective level of the arrester in kV
+    lightning_level (array of float): Lightning impulse protective level of the arrester in kV
+    switching_level (array of float): Switching impulse protective level of the arrester in kV
+    lead_length (array of float): Total arrester lead length in meters (m)
+    rate_of_rise (array of float): Surge current rate of rise in kA/µs
+    lead_inductance (float or array of float): Lead inductance in henries per meter (H/m)
+    required_margins (tuple of float): Minimum chopped-wave, lightning and switching margins as percentages
+    worst (int): Number of pairs to return in the worst-first ranking, or None for all
+    
+    Returns:
+    dict: Arrays of lead voltage in kV, the three margins and the smallest excess over its
+          required margin, all as percentages, whether each pair passes, and 'worst' with the
+          pair indices ordered from the smallest excess
+    """
+    # kA/µs equals 1e9 A/s, and the lead voltage is wanted in kV
+    lead_voltage = np.asarray(lead_inductance, dtype=float) * lead_length * np.asarray(rate_of_rise, dtype=float) * 1e6
+    margins = [
+        (protection_quality_index(chopped_wave_withstand, np.asarray(front_of_wave_level) + lead_voltage) - 1) * 100,
+        (protection_quality_index(bil, np.asarray(lightning_level) + lead_voltage) - 1) * 100,
+        (protection_quality_index(bsl, np.asarray(switching_level, dtype=float)) - 1) * 100,
+    ]
+    margins = np.broadcast_arrays(*margins)
+    excess = np.min([protective_margin(margin, required)
+                     for margin, required in zip(margins, required_margins)], axis=0)
+    if worst is None or worst >= excess.size:
+        ranking = np.argsort(excess, kind='stable')
+    else:
+        ranking = np.argpartition(excess, worst)[:worst]
+        ranking = ranking[np.argsort(excess[ranking], kind='stable')]
+    return {
+        'lead_voltage': np.broadcast_to(lead_voltage, excess.shape),
+        'chopped_wave_margin': margins[0],
+        'lightning_margin': margins[1],
+        'switching_margin': margins[2],
+        'margin_excess': excess,
+        'passes': excess >= 0,
+        'worst': ranking,
+    }
+
+def reflection_coefficient(Z1, Z2):
+    """
+    Calculate the voltage reflection coefficient of a wave travelling from impedance Z1 into Z2.
+    
+    Parameters:
+    Z1 (float or array of float): Surge impedance of the incoming line in ohms (Ω)
+    Z2 (float or array of float): Surge impedance beyond the junction in ohms (Ω)
+    
+    Returns:
+    float or array of float: Reflection coefficient
+    """
+    return (Z2 - Z1) / (Z2 + Z1)
+
+def refraction_coefficient(Z1, Z2):
+    """
+    Calculate the voltage refraction (transmission) coefficient of a wave travelling from Z1 into Z2.
+    
+    Parameters:
+    Z1 (float or array of float): Surge impedance of the incoming line in ohms (Ω)
+    Z2 (float or array of float): Surge impedance beyond the junction in ohms (Ω)
+    
+    Returns:
+    float or array of float: Refraction coefficient
+    """
+    return 2 * Z2 / (Z2 + Z1)
+
+def surge_current(t, peak, front_time, tail_time):
+    """
+    Calculate a lightning surge current with a linear front and an exponential tail.
+    
+    Parameters:
+    t (array of float): Time in seconds (s)
+    peak (float or array of float): Peak current in amperes (A)
+    front_time (float or array of float): Time to peak in seconds (s)
+    tail_time (float or array of float): Time to half value in seconds (s)
+    
+    Returns:
+    array of float: Current in amperes (A)
+    """
+    t = np.asarray(t, dtype=float)
+    tail = np.exp(-math.log(2) * (t - front_time) / (tail_time - front_time))
+    return peak * np.where(t < front_time, np.clip(t, 0, None) / front_time, tail)
+
+def _simulate_surges(network, dt, steps, source_node, peak, front_time, tail_time, waveforms):
+    """
+    Run a block of surge cases through the lattice of a network.
+    
+    Each line end keeps a ring buffer of the waves travelling towards it. At every step
+    the incoming waves of a node are combined with the precomputed refraction coefficients
+    of their line ends to give the node voltage, and each line end sends v - a back into
+    its line.
+    """
+    end_node, other_end, delay, end_refraction, node_admittance, order, starts, junctions, arrester = network
+    cases = peak.size
+    nodes = node_admittance.size
+    buffer_length = delay.max() + 1
+    buffer = np.zeros((buffer_length, cases, end_node.size))
+    t = np.arange(steps) * dt
+    case_index = np.arange(cases)
+    I_ref, V_ref, alpha = arrester
+    has_arrester = I_ref > 0
+    results = np.zeros((cases, steps, nodes)) if waveforms else np.zeros((cases, nodes))
+
+    for step in range(steps):
+        slot = step % buffer_length
+        incoming = buffer[slot]
+        # Voltage without arresters: the surge source into the node plus the refracted incoming waves
+        voltage = np.zeros((cases, nodes))
+        voltage[case_index, source_node] = surge_current(t[step], peak, front_time, tail_time) \
+            / node_admittance[source_node]
+        drive = incoming * end_refraction
+        voltage[:, junctions] += np.add.reduceat(drive[:, order], starts[:-1], axis=1)
+        if np.any(has_arrester):
+            # Newton iterations for Y v + I_ref (|v| / V_ref)^alpha = J, starting above the root
+            Y = node_admittance[has_arrester]
+            J = voltage[:, has_arrester] * Y
+            Ir, Vr, a = I_ref[has_arrester], V_ref[has_arrester], alpha[has_arrester]
+            magnitude = np.minimum(np.abs(J) / Y, Vr * (np.abs(J) / Ir) ** (1 / a))
+            for _ in range(30):
+                arrester_current = Ir * (magnitude / Vr) ** a
+                slope = Y + a * arrester_current / np.maximum(magnitude, 1e-12)
+                magnitude -= (Y * magnitude + arrester_current - np.abs(J)) / slope
+                np.maximum(magnitude, 0, out=magnitude)
+            voltage[:, has_arrester] = np.sign(J) * magnitude
+        outgoing = voltage[:, end_node] - incoming
+        buffer[slot] = 0
+        buffer[(step + delay) % buffer_length, :, other_end] = outgoing.T
+        if waveforms:
+            results[:, step] = voltage
+        else:
+            np.maximum(results, np.abs(voltage), out=results)
+    return results
+
+def traveling_wave_simulation(from_node, to_node, Zc, travel_time, dt, duration, source_node, peak,
+                              front_time=1.2e-6, tail_time=50e-6, shunt_resistance=None,
+                              arrester_reference_current=None, arrester_reference_voltage=None,
+                              arrester_exponent=25.0, waveforms=False, workers=1, cases_per_task=100):
+    """
+    Simulate lightning surges travelling through a network of lines, cables and arresters.
+    
+    The network is solved as a lattice diagram with a fixed time step: travel times are
+    rounded to whole steps, waves in transit are held in array delay buffers, and the
+    refraction coefficient of every line end into the rest of its junction is computed
+    once from the surge impedances. Lines are lossless. Arresters follow I = I_ref (V / V_ref)^exponent.
+    Surge cases are simulated side by side and may be spread over a process pool.
+    
+    Parameters:
+    from_node (array of int): Sending node of every line
+    to_node (array of int): Receiving node of every line
+    Zc (array of float): Surge impedance of every line in ohms (Ω), see characteristic_impedance
+    travel_time (array of float): Travel time of every line in seconds (s)
+    dt (float): Time step in seconds (s)
+    duration (float): Simulated time in seconds (s)
+    source_node (array of int): Node struck in every case
+    peak (array of float): Peak stroke current of every case in amperes (A)
+    front_time (array of float): Time to peak of every case in seconds (s)
+    tail_time (array of float): Time to half value of every case in seconds (s)
+    shunt_resistance (array of float): Resistance to ground at every node in ohms (Ω), inf where open
+    arrester_reference_current (array of float): Arrester reference current at every node in amperes (A), 0 where none
+    arrester_reference_voltage (array of float): Arrester voltage at the reference current in volts (V)
+    arrester_exponent (float or array of float): Arrester nonlinearity exponent
+    waveforms (bool): Return the full voltage waveforms instead of the peak voltages
+    workers (int): Number of worker processes (1 runs in the current process)
+    cases_per_task (int): Number of cases simulated per task
+    
+    Returns:
+    array of float: Voltage in volts (V) shaped (cases x steps x nodes) with waveforms, or the
+                    peak absolute voltage shaped (cases x nodes)
+    """
+    from_node = np.asarray(from_node, dtype=np.int64)
+    to_node = np.asarray(to_node, dtype=np.int64)
+    nodes = int(max(from_node.max(), to_node.max())) + 1
+    lines = from_node.size
+    admittance = 1 / np.broadcast_to(np.asarray(Zc, dtype=float), (lines,))
+    delay = np.maximum(np.rint(np.broadcast_to(np.asarray(travel_time, dtype=float), (lines,)) / dt), 1).astype(np.int64)
+
+    # Line ends 0..lines-1 sit at the sending nodes and lines..2*lines-1 at the receiving nodes
+    end_node = np.concatenate([from_node, to_node])
+    other_end = np.concatenate([np.arange(lines, 2 * lines), np.arange(lines)])
+    end_admittance = np.concatenate([admittance, admittance])
+    end_delay = np.concatenate([delay, delay])
+    order = np.argsort(end_node, kind='stable')
+    starts = np.concatenate([np.flatnonzero(np.diff(end_node[order], prepend=-1)), [end_node.size]])
+
+    shunt = np.inf if shunt_resistance is None else np.asarray(shunt_resistance, dtype=float)
+    node_admittance = np.bincount(end_node, weights=end_admittance, minlength=nodes) \
+        + 1 / np.broadcast_to(shunt, (nodes,))
+    if arrester_reference_current is None:
+        arrester = (np.zeros(nodes), np.ones(nodes), np.ones(nodes))
+    else:
+        arrester = tuple(np.broadcast_to(np.asarray(value, dtype=float), (nodes,)).copy() for value in
+                         (arrester_reference_current, arrester_reference_voltage, arrester_exponent))
+    # A wave arriving on a line end sees the other line ends and the shunt of its node in parallel
+    end_Zc = 1 / end_admittance
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rest_impedance = 1 / np.maximum(node_admittance[end_node] - end_admittance, 0)
+        end_refraction = np.where(np.isinf(rest_impedance), 2.0, refraction_coefficient(end_Zc, rest_impedance))
+    junctions = end_node[order][starts[:-1]]
+    network = (end_node, other_end, end_delay, end_refraction, node_admittance, order, starts, junctions, arrester)
+
+    source_node = np.atleast_1d(np.asarray(source_node, dtype=np.int64))
+    peak = np.atleast_1d(np.asarray(peak, dtype=float))
+    cases = max(source_node.size, peak.size)
+    case_arrays = [np.broadcast_to(np.asarray(value, dtype=float if k else np.int64), (cases,))
+                   for k, value in enumerate((source_node, peak, front_time, tail_time))]
+    steps = int(round(duration / dt))
+    tasks = [(network, dt, steps) + tuple(value[start:start + cases_per_task] for value in case_arrays) + (waveforms,)
+             for start in range(0, cases, cases_per_task)]
+    if workers == 1:
+        results = [_simulate_surges(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_simulate_surges, *zip(*tasks)))
+    return np.concatenate(results)
+
 if __name__ == "__main__":
     pass
@@ -1,5 +1,17 @@
 import math
-import cmath
+
+import numpy as np
+
+# Standard CT primary ratings in amperes for a 5 A secondary (IEEE C57.13)
+STANDARD_CT_PRIMARIES = np.array([
+    50, 100, 150, 200, 250, 300, 400, 500, 600, 800, 900, 1000, 1200, 1500, 1600,
+    2000, 2400, 2500, 3000, 3200, 4000, 5000, 6000, 8000, 10000, 12000,
+], dtype=float)
+
+# Typical time-overcurrent relay tap settings in secondary amperes
+STANDARD_RELAY_TAPS = np.array([
+    0.5, 0.6, 0.8, 1.0, 1.2, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 5.0, 6.0, 7.0, 8.0, 10.0, 12.0,
+])
 
 def calculate_power_factor(method, P=None, S=None, theta=None):
     """
@@ -44,26 +56,25 @@ def calculate_complex_power(V=None, I=None, P=None, Q=None, theta=None):
     or given real power (P) and reactive power (Q).
     
     Parameters:
-    V (float): Voltage in volts (V), required if P and Q are not provided
-    I (float): Current in amperes (A), required if P and Q are not provided
-    P (float): Real power in watts (W), required if V and I are not provided
-    Q (float): Reactive power in VAR (var), required if V and I are not provided
-    theta (float): Phase angle in degrees (optional)
+    V (float or array of float): Voltage in volts (V), required if P and Q are not provided
+    I (float or array of float): Current in amperes (A), required if P and Q are not provided
+    P (float or array of float): Real power in watts (W), required if V and I are not provided
+    Q (float or array of float): Reactive power in VAR (var), required if V and I are not provided
+    theta (float or array of float): Phase angle in degrees (optional)
     
     Returns:
-    complex: Complex power (S) as a complex number
+    complex or array of complex: Complex power (S)
     """
     if V is not None and I is not None:
         if theta is not None:
             # Calculate complex power using phase angle
-            theta_radians = math.radians(theta)
-            S = V * I * (cmath.cos(theta_radians) + 1j * cmath.sin(theta_radians))
+            S = V * I * np.exp(1j * np.radians(theta))
         else:
             # Calculate complex power without phase angle
             S = V * I
     elif P is not None and Q is not None:
         # Calculate complex power using real power and reactive power
-        S = complex(P, Q)
+        S = complex(P, Q) if np.isscalar(P) and np.isscalar(Q) else P + 1j * np.asarray(Q, dtype=float)
     else:
         raise ValueError("Either V and I, or P and Q must be provided.")
     
@@ -74,18 +85,89 @@ def two_wattmeter_method(W1, W2):
     Calculate the total power (P), reactive power (Q), and apparent power (S) using the Two-Wattmeter Method.
     
     Parameters:
-    W1 (float): Power measured by the first wattmeter (W1)
-    W2 (float): Power measured by the second wattmeter (W2)
+    W1 (float or array of float): Power measured by the first wattmeter (W1)
+    W2 (float or array of float): Power measured by the second wattmeter (W2)
     
     Returns:
-    tuple: Total power (P), reactive power (Q), and apparent power (S)
+    tuple: Total power (P), reactive power magnitude (Q), and apparent power (S)
     """
     P = W1 + W2
-    Q = math.sqrt((W1 - W2) ** 2)
-    S = math.sqrt(P ** 2 + Q ** 2)
+    Q = math.sqrt(3) * np.abs(W1 - W2)
+    S = np.hypot(P, Q)
     
     return P, Q, S
 
+def power_factor_from_power(P, S):
+    """
+    Calculate the power factor and phase angle from real and apparent power arrays.
+    
+    Parameters:
+    P (array of float): Real power in watts (W)
+    S (array of float): Apparent power in volt-amperes (VA)
+    
+    Returns:
+    tuple: Power factor and phase angle in degrees (NaN where S is zero)
+    """
+    P = np.asarray(P, dtype=float)
+    S = np.asarray(S, dtype=float)
+    power_factor = np.full(np.broadcast(P, S).shape, np.nan)
+    np.divide(P, S, out=power_factor, where=S != 0)
+    np.clip(power_factor, -1.0, 1.0, out=power_factor)
+    return power_factor, np.degrees(np.arccos(power_factor))
+
+def two_wattmeter_power(W1, W2, sequence='abc'):
+    """
+    Calculate signed three-phase power quantities from two-wattmeter readings.
+    
+    For a balanced load, W1 = VI cos(30° + phi) and W2 = VI cos(30° - phi) with ABC
+    rotation, so Q = sqrt(3) * (W2 - W1) is positive for lagging loads. ACB rotation
+    reverses the sign.
+    
+    Parameters:
+    W1 (array of float): Power measured by the first wattmeter in watts (W)
+    W2 (array of float): Power measured by the second wattmeter in watts (W)
+    sequence (str): Phase sequence, 'abc' or 'acb'
+    
+    Returns:
+    tuple: Real power P (W), reactive power Q (var, positive lagging), apparent power S (VA)
+           and power factor (positive lagging, negative leading, NaN where S is zero)
+    """
+    if sequence not in ('abc', 'acb'):
+        raise ValueError("Invalid phase sequence. Use 'abc' or 'acb'.")
+    W1 = np.asarray(W1, dtype=float)
+    W2 = np.asarray(W2, dtype=float)
+    P = W1 + W2
+    Q = math.sqrt(3) * (W2 - W1)
+    if sequence == 'acb':
+        Q = -Q
+    S = np.hypot(P, Q)
+    power_factor, _ = power_factor_from_power(P, S)
+    return P, Q, S, np.copysign(power_factor, np.where(Q < 0, -1.0, 1.0))
+
+def two_wattmeter_chunks(readings, chunk_size=86400, sequence='abc'):
+    """
+    Process two-wattmeter readings block by block so long records stay in bounded memory.
+    
+    Parameters:
+    readings (2D array of float, str or iterable): W1 and W2 readings as an (samples x 2)
+                                                   array or memory map, the path of such an
+                                                   .npy file, or an iterable of (W1, W2) blocks
+    chunk_size (int): Number of samples per block for arrays and files
+    sequence (str): Phase sequence, 'abc' or 'acb'
+    
+    Yields:
+    tuple: P, Q, S and power factor arrays of each block, as returned by two_wattmeter_power
+    """
+    if isinstance(readings, str):
+        readings = np.load(readings, mmap_mode='r')
+    if isinstance(readings, np.ndarray):
+        for start in range(0, readings.shape[0], chunk_size):
+            block = np.asarray(readings[start:start + chunk_size], dtype=float)
+            yield two_wattmeter_power(block[:, 0], block[:, 1], sequence)
+    else:
+        for W1, W2 in readings:
+            yield two_wattmeter_power(W1, W2, sequence)
+
 def power_triangle(S=None, P=None, Q=None):
     """
     Calculate the sides of the power triangle given any two of the values S (apparent power), P (real power), and Q (reactive power).
@@ -158,5 +240,120 @@ def calculate_vt_ratio(primary_voltage, secondary_voltage):
     
     return primary_voltage / secondary_voltage
 
+def select_ct_and_tap(load_current, fault_current, burden, accuracy_voltage=400, pickup_factor=1.5,
+                      load_margin=1.0, winding_resistance=0.0, x_over_r=0.0, full_ratio_primary=None,
+                      secondary_rating=5.0, ct_primaries=STANDARD_CT_PRIMARIES, relay_taps=STANDARD_RELAY_TAPS):
+    """
+    Select CT ratios and relay taps for many relay locations and check CT saturation.
+    
+    The CT primary is the smallest standard rating that carries the load current times
+    load_margin and keeps the maximum fault current within 20 times rated secondary
+    current. The tap is the smallest standard tap at or above the pickup current referred
+    to the secondary. The CT saturates when the secondary voltage needed to drive the
+    fault current through the burden, multiplied by (1 + X/R) for DC offset, exceeds the
+    C-class voltage, derated for tapped multi-ratio CTs.
+    
+    Parameters:
+    load_current (array of float): Maximum load current in amperes (A)
+    fault_current (array of float): Maximum fault current in amperes (A)
+    burden (array of float): Total secondary burden (leads and relay) in ohms (Ω)
+    accuracy_voltage (array of float): C-class rating of the CT, such as 100, 200, 400 or 800
+    pickup_factor (array of float): Pickup current as a multiple of the load current
+    load_margin (array of float): Multiple of the load current the CT primary must carry
+    winding_resistance (array of float): CT secondary winding resistance in ohms (Ω)
+    x_over_r (array of float): X/R ratio of the fault, or 0 to check symmetrical current only
+    full_ratio_primary (array of float): Full-winding primary rating of multi-ratio CTs, or None
+                                         when the selected ratio is the full winding
+    secondary_rating (float): Rated secondary current in amperes (A)
+    ct_primaries (array of float): Available CT primary ratings in amperes (A), ascending
+    relay_taps (array of float): Available relay taps in secondary amperes (A), ascending
+    
+    Returns:
+    dict: Arrays of CT primary rating, CT ratio, tap setting, secondary pickup current, fault
+          current in multiples of tap, required and available secondary voltage, and flags for
+          saturation, no CT rating large enough and no tap large enough
+    """
+    load_current = np.asarray(load_current, dtype=float)
+    fault_current = np.asarray(fault_current, dtype=float)
+    ct_primaries = np.asarray(ct_primaries, dtype=float)
+    relay_taps = np.asarray(relay_taps, dtype=float)
+
+    required_primary = np.maximum(load_current * load_margin, fault_current / 20)
+    ct_index = np.searchsorted(ct_primaries, required_primary, side='left')
+    no_ct_rating = ct_index >= ct_primaries.size
+    primary = ct_primaries[np.minimum(ct_index, ct_primaries.size - 1)]
+    ct_ratio = calculate_ct_ratio(primary, secondary_rating)
+
+    pickup = select_tap_setting(load_current * pickup_factor, ct_ratio)
+    tap_index = np.searchsorted(relay_taps, pickup, side='left')
+    no_tap = tap_index >= relay_taps.size
+    tap = relay_taps[np.minimum(tap_index, relay_taps.size - 1)]
+
+    secondary_fault = fault_current / ct_ratio
+    required_voltage = secondary_fault * (np.asarray(winding_resistance, dtype=float) + burden) * (1 + np.asarray(x_over_r, dtype=float))
+    full_primary = primary if full_ratio_primary is None else np.asarray(full_ratio_primary, dtype=float)
+    available_voltage = np.asarray(accuracy_voltage, dtype=float) * np.minimum(primary / full_primary, 1.0)
+    return {
+        'ct_primary': primary,
+        'ct_ratio': ct_ratio,
+        'tap': tap,
+        'pickup': pickup,
+        'fault_multiple_of_tap': secondary_fault / tap,
+        'required_voltage': required_voltage,
+        'available_voltage': available_voltage,
+        'saturates': required_voltage > available_voltage,
+        'no_ct_rating': no_ct_rating,
+        'no_tap': no_tap,
+    }
+
+def correct_metered_power(P, Q, loading_points, ct_rcf, ct_phase_angle, vt_rcf=1.0, vt_phase_angle=0.0,
+                          rated_va=None, ct_ratio=1.0, vt_ratio=1.0):
+    """
+    Correct metered real and reactive power for instrument transformer errors.
+    
+    The CT ratio correction factor (RCF) and phase angle of every meter are interpolated
+    at the loading of each interval, taken as the metered apparent power in percent of
+    rated_va. The corrected complex power is S * RCF_ct * RCF_vt * exp(j(beta - gamma)),
+    where beta and gamma are the CT and VT phase angles (positive when the secondary
+    leads the primary), scaled to primary quantities by the CT and VT ratios.
+    
+    Parameters:
+    P (array of float): Metered real power shaped (intervals x meters) or (meters,)
+    Q (array of float): Metered reactive power in the same shape as P
+    loading_points (array of float): Test points of the CT correction tables in percent of rated current, ascending
+    ct_rcf (2D array of float): CT ratio correction factors shaped (meters x loading points)
+    ct_phase_angle (2D array of float): CT phase angles in minutes shaped (meters x loading points)
+    vt_rcf (float or array of float): VT ratio correction factor of every meter
+    vt_phase_angle (float or array of float): VT phase angle of every meter in minutes
+    rated_va (float or array of float): Metered apparent power at rated CT current of every meter,
+                                        or None to use the first loading point only
+    ct_ratio (float or array of float): CT ratio of every meter, or 1 if the meter reads primary values
+    vt_ratio (float or array of float): VT ratio of every meter, or 1 if the meter reads primary values
+    
+    Returns:
+    tuple: Corrected real power and reactive power arrays
+    """
+    S = np.atleast_1d(np.array(calculate_complex_power(P=np.asarray(P, dtype=float), Q=Q), dtype=complex))
+    loading_points = np.asarray(loading_points, dtype=float)
+    ct_rcf = np.atleast_2d(np.asarray(ct_rcf, dtype=float))
+    ct_phase_angle = np.atleast_2d(np.asarray(ct_phase_angle, dtype=float))
+    meter = np.broadcast_to(np.arange(ct_rcf.shape[0]), S.shape)
+
+    if rated_va is None or loading_points.size == 1:
+        rcf = ct_rcf[meter, 0]
+        beta = ct_phase_angle[meter, 0]
+    else:
+        loading = np.clip(100 * np.abs(S) / rated_va, loading_points[0], loading_points[-1])
+        index = np.clip(np.searchsorted(loading_points, loading, side='right') - 1, 0, loading_points.size - 2)
+        fraction = (loading - loading_points[index]) / (loading_points[index + 1] - loading_points[index])
+        rcf = ct_rcf[meter, index] + fraction * (ct_rcf[meter, index + 1] - ct_rcf[meter, index])
+        beta = ct_phase_angle[meter, index] + fraction * (
+            ct_phase_angle[meter, index + 1] - ct_phase_angle[meter, index])
+
+    correction = rcf * (np.asarray(vt_rcf, dtype=float) * ct_ratio * vt_ratio)
+    angle = np.radians((beta - vt_phase_angle) / 60)
+    S *= correction * np.exp(1j * angle)
+    return S.real, S.imag
+
 if __name__ == "__main__":
     pass
@@ -1,18 +1,22 @@
-import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
 
 def absorption_current(I0, time, constant):
     """
     Calculate the absorption current given initial current, time, and a constant.
     
     Parameters:
-    I0 (float): Initial current in amperes (A)
-    time (float): Time in seconds (s)
-    constant (float): Absorption constant
+    I0 (float or array of float): Initial current in amperes (A)
+    time (float or array of float): Time in seconds (s)
+    constant (float or array of float): Absorption constant
     
     Returns:
-    float: Absorption current in amperes (A)
+    float or array of float: Absorption current in amperes (A)
     """
-    return I0 * math.exp(-constant * time)
+    return I0 * np.exp(-constant * np.asarray(time, dtype=float))
 
 def minimum_insulation_resistance(V, I):
     """
@@ -36,14 +40,14 @@ def effect_of_temperature_on_insulation_resistance(R0, T, T0, k):
     
     Parameters:
     R0 (float): Insulation resistance at reference temperature T0 in ohms (Ω)
-    T (float): Temperature in degrees Celsius (°C)
-    T0 (float): Reference temperature in degrees Celsius (°C)
-    k (float): Temperature coefficient
+    T (float or array of float): Temperature in degrees Celsius (°C)
+    T0 (float or array of float): Reference temperature in degrees Celsius (°C)
+    k (float or array of float): Temperature coefficient
     
     Returns:
-    float: Insulation resistance at temperature T in ohms (Ω)
+    float or array of float: Insulation resistance at temperature T in ohms (Ω)
     """
-    return R0 * math.exp(-k * (T - T0))
+    return R0 * np.exp(-k * (np.asarray(T, dtype=float) - T0))
 
 def coefficient_k_thermosetting(T):
     """
@@ -85,5 +89,276 @@ def polarization_index(R60, R10):
     
     return R60 / R10
 
+THERMOSETTING = 0
+THERMOPLASTIC = 1
+
+# One megger test: insulation resistance after 30 s, 1 min and 10 min at the test temperature
+INSULATION_TEST_DTYPE = np.dtype([
+    ('asset', np.int64),
+    ('date', 'datetime64[D]'),
+    ('temperature', np.float64),
+    ('insulation_class', np.int8),
+    ('test_voltage', np.float64),
+    ('r30', np.float64),
+    ('r60', np.float64),
+    ('r600', np.float64),
+])
+
+def _ratio(numerator, denominator):
+    out = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    return np.divide(numerator, denominator, out=out, where=denominator != 0)
+
+# Temperature range and step of the precomputed correction tables
+CORRECTION_TABLE_TEMPERATURES = np.linspace(-40.0, 150.0, 1901)
+
+def _exact_log_correction(T, insulation_class, reference_temperature):
+    k = np.where(insulation_class == THERMOPLASTIC,
+                 coefficient_k_thermoplastic(T), coefficient_k_thermosetting(T))
+    return np.log(effect_of_temperature_on_insulation_resistance(1.0, reference_temperature, T, k))
+
+@lru_cache(maxsize=None)
+def temperature_correction_table(reference_temperature=40):
+    """
+    Build the logarithmic temperature correction tables of every insulation class.
+    
+    Tables are built once per reference temperature and reused by later calls.
+    
+    Parameters:
+    reference_temperature (float): Reference temperature in degrees Celsius (°C)
+    
+    Returns:
+    2D array of float: Natural logarithm of the correction factor shaped
+                       (insulation classes x CORRECTION_TABLE_TEMPERATURES)
+    """
+    T = CORRECTION_TABLE_TEMPERATURES
+    table = np.stack([_exact_log_correction(T, insulation_class, reference_temperature)
+                      for insulation_class in (THERMOSETTING, THERMOPLASTIC)])
+    table.setflags(write=False)
+    return table
+
+def corrected_insulation_resistance(R, T, insulation_class, reference_temperature=40):
+    """
+    Correct insulation resistance readings to a reference temperature.
+    
+    Correction factors are interpolated in the cached tables of every insulation class;
+    temperatures outside the tables are corrected exactly.
+    
+    Parameters:
+    R (array of float): Insulation resistance measured at temperature T in ohms (Ω)
+    T (array of float): Winding temperature during the test in degrees Celsius (°C)
+    insulation_class (array of int): THERMOSETTING or THERMOPLASTIC for every reading
+    reference_temperature (float): Reference temperature in degrees Celsius (°C)
+    
+    Returns:
+    array of float: Insulation resistance at the reference temperature in ohms (Ω)
+    """
+    T = np.asarray(T, dtype=float)
+    insulation_class = np.asarray(insulation_class)
+    table = temperature_correction_table(reference_temperature)
+    grid = CORRECTION_TABLE_TEMPERATURES
+    step = grid[1] - grid[0]
+    position = (T - grid[0]) / step
+    index = np.clip(position.astype(np.int64), 0, grid.size - 2)
+    fraction = position - index
+    log_factor = table[insulation_class, index] * (1 - fraction) + table[insulation_class, index + 1] * fraction
+    outside = (T < grid[0]) | (T > grid[-1])
+    if np.any(outside):
+        log_factor = np.where(outside, _exact_log_correction(T, insulation_class, reference_temperature), log_factor)
+    return R * np.exp(log_factor)
+
+def insulation_test_trends(records, reference_temperature=40):
+    """
+    Calculate temperature-corrected IR, polarization index and dielectric absorption ratio for many tests.
+    
+    Parameters:
+    records (structured array): Tests with the fields of INSULATION_TEST_DTYPE
+    reference_temperature (float): Reference temperature in degrees Celsius (°C)
+    
+    Returns:
+    dict: Arrays of corrected 1-minute IR in ohms (Ω), PI (10 min / 1 min) and DAR (1 min / 30 s);
+          ratios with a zero denominator are NaN
+    """
+    return {
+        'corrected_ir': corrected_insulation_resistance(
+            records['r60'], records['temperature'], records['insulation_class'], reference_temperature),
+        'polarization_index': _ratio(records['r600'], records['r60']),
+        'dielectric_absorption_ratio': _ratio(records['r60'], records['r30']),
+    }
+
+class InsulationTestStore:
+    """
+    Append-only history of insulation tests for a fleet of assets.
+    
+    Tests are stored as raw INSULATION_TEST_DTYPE records in <path> and read back through
+    a memory map. An index in <path>.index.npz holds the lowest temperature-corrected
+    1-minute IR of every asset in every year; it is updated from the new records on each
+    append, so year-over-year queries read the index instead of the test history.
+    
+    Parameters:
+    path (str): Path of the record file
+    reference_temperature (float): Reference temperature in degrees Celsius (°C)
+    """
+
+    def __init__(self, path, reference_temperature=40):
+        self.path = path
+        self.index_path = path + '.index.npz'
+        self.reference_temperature = reference_temperature
+        if os.path.exists(self.index_path):
+            with np.load(self.index_path) as index:
+                self.assets = index['assets']
+                self.first_year = int(index['first_year'])
+                self.annual_ir = index['annual_ir']
+        else:
+            self.assets = np.empty(0, dtype=np.int64)
+            self.first_year = 0
+            self.annual_ir = np.empty((0, 0))
+
+    def __len__(self):
+        if not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // INSULATION_TEST_DTYPE.itemsize
+
+    def records(self):
+        """
+        Return every stored test as a read-only memory-mapped structured array.
+        """
+        if len(self) == 0:
+            return np.empty(0, dtype=INSULATION_TEST_DTYPE)
+        return np.memmap(self.path, dtype=INSULATION_TEST_DTYPE, mode='r', shape=(len(self),))
+
+    def append(self, records):
+        """
+        Append tests to the store and update the annual index.
+        
+        Parameters:
+        records (structured array): Tests with the fields of INSULATION_TEST_DTYPE
+        """
+        records = np.asarray(records, dtype=INSULATION_TEST_DTYPE)
+        with open(self.path, 'ab') as file:
+            records.tofile(file)
+
+        years = records['date'].astype('datetime64[Y]').astype(np.int64) + 1970
+        assets = np.union1d(self.assets, records['asset'])
+        first_year = min(years.min(), self.first_year) if self.annual_ir.size else years.min()
+        last_year = max(years.max(), self.first_year + self.annual_ir.shape[1] - 1) if self.annual_ir.size else years.max()
+        annual_ir = np.full((assets.size, last_year - first_year + 1), np.nan)
+        if self.annual_ir.size:
+            rows = np.searchsorted(assets, self.assets)
+            offset = self.first_year - first_year
+            annual_ir[rows, offset:offset + self.annual_ir.shape[1]] = self.annual_ir
+
+        corrected = insulation_test_trends(records, self.reference_temperature)['corrected_ir']
+        np.fmin.at(annual_ir, (np.searchsorted(assets, records['asset']), years - first_year), corrected)
+        self.assets, self.first_year, self.annual_ir = assets, int(first_year), annual_ir
+        np.savez(self.index_path, assets=assets, first_year=first_year, annual_ir=annual_ir)
+
+    def assets_with_ir_drop(self, percent, year=None):
+        """
+        Find assets whose corrected IR dropped by more than a percentage from the previous year.
+        
+        Parameters:
+        percent (float): Drop threshold as a percentage
+        year (int): Year to compare with the year before, or None for the latest year
+        
+        Returns:
+        tuple: Asset numbers and their drops as a percentage
+        """
+        if self.annual_ir.shape[1] < 2:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        column = self.annual_ir.shape[1] - 1 if year is None else year - self.first_year
+        if not 1 <= column < self.annual_ir.shape[1]:
+            raise ValueError("No previous year of tests to compare with.")
+        previous = self.annual_ir[:, column - 1]
+        drop = 100 * (1 - _ratio(self.annual_ir[:, column], previous))
+        selected = drop > percent
+        return self.assets[selected], drop[selected]
+
+def _fit_test_currents(time, currents, constants, time_constants):
+    """
+    Fit a block of test current records sharing one time base.
+    
+    Every (absorption constant, capacitive time constant) pair on the grid gives a
+    design matrix shared by all records, so the best linear fit of every record is
+    found by projecting onto its orthonormal basis. The absorption constant is then
+    refined by a parabola through the residuals of its neighbours on the grid.
+    """
+    grid = [(k, tau) for tau in time_constants for k in constants]
+    total = np.einsum('ij,ij->i', currents, currents)
+    rss = np.empty((currents.shape[0], len(grid)))
+    for g, (k, tau) in enumerate(grid):
+        design = np.column_stack([np.ones_like(time), absorption_current(1.0, time, k)]
+                                 + ([np.exp(-time / tau)] if tau else []))
+        basis, _ = np.linalg.qr(design)
+        projection = currents @ basis
+        rss[:, g] = total - np.einsum('ij,ij->i', projection, projection)
+
+    best = rss.argmin(axis=1)
+    k_index, tau_index = best % len(constants), best // len(constants)
+    log_k = np.log(constants)
+    k_fit = log_k[k_index]
+    inner = (k_index > 0) & (k_index < len(constants) - 1)
+    rows = np.flatnonzero(inner)
+    left, centre, right = rss[rows, best[rows] - 1], rss[rows, best[rows]], rss[rows, best[rows] + 1]
+    curvature = left - 2 * centre + right
+    step = log_k[1] - log_k[0] if len(constants) > 1 else 0.0
+    shift = np.divide(0.5 * (left - right), curvature, out=np.zeros_like(curvature), where=curvature > 0)
+    k_fit[rows] += np.clip(shift, -0.5, 0.5) * step
+    k_fit = np.exp(k_fit)
+    tau_fit = np.asarray(time_constants, dtype=float)[tau_index]
+
+    # Final amplitudes with the refined constants, solved for all records at once
+    capacitive_fit = tau_fit > 0
+    design = np.stack([np.ones((currents.shape[0], time.size)),
+                       absorption_current(1.0, time, k_fit[:, np.newaxis]),
+                       np.exp(-time / np.where(capacitive_fit, tau_fit, 1.0)[:, np.newaxis])
+                       * capacitive_fit[:, np.newaxis]], axis=2)
+    normal = np.einsum('rsi,rsj->rij', design, design)
+    # Records fitted without a capacitive component get a zero amplitude for it
+    normal[:, 2, 2] += ~capacitive_fit
+    amplitudes = np.linalg.solve(normal, np.einsum('rsi,rs->ri', design, currents)[..., np.newaxis])[..., 0]
+    residual = currents - np.einsum('rsi,ri->rs', design, amplitudes)
+    spread = currents - currents.mean(axis=1, keepdims=True)
+    r_squared = 1 - np.einsum('ij,ij->i', residual, residual) / np.einsum('ij,ij->i', spread, spread)
+    return amplitudes[:, 0], amplitudes[:, 1], k_fit, amplitudes[:, 2], tau_fit, r_squared
+
+def fit_absorption_current(time, currents, constants=None, time_constants=(0, 0.5, 1, 2, 5),
+                           workers=1, records_per_task=1000):
+    """
+    Fit leakage, absorption and capacitive components to time-resolved insulation test currents.
+    
+    The model is I(t) = I_leakage + I0 * exp(-constant * t) + I_C * exp(-t / tau), fitted by
+    least squares over a grid of absorption constants and capacitive time constants. Amplitudes
+    are not constrained to be positive.
+    
+    Parameters:
+    time (array of float): Sample times in seconds (s), shared by all records
+    currents (2D array of float): Test current in amperes (A), shaped (records x samples)
+    constants (array of float): Candidate absorption constants in 1/s, evenly spaced in
+                                log scale, or None for 150 values from 1e-4 to 1
+    time_constants (array of float): Candidate capacitive time constants in seconds (s);
+                                     0 fits no capacitive component
+    workers (int): Number of worker processes (1 runs in the current process)
+    records_per_task (int): Number of records fitted per task
+    
+    Returns:
+    dict: Arrays of leakage current, I0 and capacitive current in amperes (A), absorption
+          constant in 1/s, capacitive time constant in seconds (s) and R² of the fit
+    """
+    time = np.asarray(time, dtype=float)
+    currents = np.atleast_2d(np.asarray(currents, dtype=float))
+    if currents.shape[1] != time.size:
+        raise ValueError("Every record must have one current sample per time.")
+    constants = np.logspace(-4, 0, 150) if constants is None else np.asarray(constants, dtype=float)
+    blocks = [currents[start:start + records_per_task] for start in range(0, currents.shape[0], records_per_task)]
+    tasks = [(time, block, constants, time_constants) for block in blocks]
+    if workers == 1:
+        results = [_fit_test_currents(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_fit_test_currents, *zip(*tasks)))
+    keys = ('leakage_current', 'I0', 'absorption_constant', 'capacitive_current',
+            'capacitive_time_constant', 'r_squared')
+    return {key: np.concatenate(values) for key, values in zip(keys, zip(*results))}
+
 if __name__ == "__main__":
     pass